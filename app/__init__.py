@@ -3,13 +3,53 @@ from config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from app.hashing import PasswordHasher
+from app.replicas import RoutingSession
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-login = LoginManager(app)
-login = LoginManager(app)
-login.login_view = 'login'
+# Extensions are created unbound and attached to each app in create_app()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
+login = LoginManager()
+login.login_view = 'main.login'
+hasher = PasswordHasher()
 
-from app import routes, models
+
+def create_app(config_class=Config):
+    """Build an app from `config_class`, registering only the blueprints it enables."""
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    login.init_app(app)
+    hasher.init_app(app)
+
+    from app import events, database, fragments, instrumentation, replicas
+    events.init_app(app)
+    database.init_app(app)
+    replicas.init_app(app)
+    fragments.init_app(app)
+    instrumentation.init_app(app)
+
+    from app.routes import bp as main_bp
+    app.register_blueprint(main_bp)
+
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp)
+
+    # Admin pages and uploads pull in the export and import machinery, so only load them when enabled
+    if app.config['ADMIN_ENABLED']:
+        from app.admin import bp as admin_bp
+        app.register_blueprint(admin_bp)
+
+    if app.config['IMPORTS_ENABLED']:
+        from app.importer import bp as imports_bp
+        app.register_blueprint(imports_bp)
+
+    from app.cli import bp as cli_bp
+    app.register_blueprint(cli_bp)
+
+    return app
+
+
+from app import models
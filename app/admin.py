@@ -0,0 +1,161 @@
+from app import db
+from app.instrumentation import metrics
+from app.models import User, Family, Baby, Feeding, FeedingArchive, Changing, Sleeping, Note, Recipe, RecipeUsage, \
+    RecipeIngredient, SearchDocument, SearchTerm, Job, users_families
+from datetime import date, datetime
+import csv
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for, Response, \
+    stream_with_context
+from flask_login import current_user, login_required
+from functools import wraps
+import io
+import json
+import sqlalchemy as sa
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Tables browsable from the admin panel, in display order
+ADMIN_TABLES = {table.name: table for table in (
+    users_families, Family.__table__, User.__table__, Baby.__table__, Recipe.__table__, RecipeUsage.__table__,
+    RecipeIngredient.__table__, Feeding.__table__, FeedingArchive.__table__, Changing.__table__, Sleeping.__table__,
+    Note.__table__, SearchDocument.__table__, SearchTerm.__table__, Job.__table__,
+)}
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def _coerce(column, value):
+    """Convert a query-string value to the Python type of `column`."""
+    python_type = column.type.python_type
+    if python_type is bool:
+        return value.lower() in ('1', 'true', 'yes')
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+def filtered_query(table, args):
+    """Build a SELECT for `table` filtered by exact column values and a free-text `q` search.
+
+    Raises ValueError if a filter value does not match its column type.
+    """
+    query = sa.select(table)
+    for column in table.c:
+        value = args.get(column.name)
+        if value:
+            query = query.where(column == _coerce(column, value))
+    search = args.get('q')
+    text_columns = [column for column in table.c if isinstance(column.type, sa.String)]
+    if search and text_columns:
+        query = query.where(sa.or_(*(column.ilike(f'%{search}%') for column in text_columns)))
+    return query.order_by(*(column.desc() for column in table.primary_key))
+
+def table_counts():
+    """Count the rows of every admin table."""
+    return {name: db.session.scalar(sa.select(sa.func.count()).select_from(table))
+            for name, table in ADMIN_TABLES.items()}
+
+def job_status_counts():
+    """Number of background jobs in each status."""
+    return dict(db.session.execute(sa.select(Job.status, sa.func.count()).group_by(Job.status)).all())
+
+def paginate(query, page, per_page):
+    """Fetch one page of `query` together with the total number of matching rows."""
+    total = db.session.scalar(sa.select(sa.func.count()).select_from(query.order_by(None).subquery()))
+    rows = db.session.execute(query.limit(per_page).offset((page - 1) * per_page)).all()
+    return rows, total
+
+def _stream_rows(query):
+    """Yield rows using a server-side cursor so memory stays flat however big the table is."""
+    yield from db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def export_csv(table, query):
+    """Yield a CSV document for `query` one batch of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(table.c.keys())
+    for count, row in enumerate(_stream_rows(query), 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson(table, query):
+    """Yield one JSON object per line for `query`."""
+    for row in _stream_rows(query):
+        yield json.dumps(row._asdict(), default=_json_default) + '\n'
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+}
+
+def admin_required(func):
+    """Decorator to restrict access to admins only."""
+    @wraps(func)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            abort(403)  # Forbidden
+        return func(*args, **kwargs)
+
+    return decorated_function
+
+@bp.route('')
+@login_required
+@admin_required
+def index():
+    return render_template('admin.html', title='Admin', counts=table_counts(), job_counts=job_status_counts())
+
+@bp.route('/<table_name>')
+@login_required
+@admin_required
+def browse_table(table_name):
+    table = ADMIN_TABLES.get(table_name)
+    if table is None:
+        abort(404)
+    page = max(request.args.get('page', 1, type=int), 1)
+    filters = {key: value for key, value in request.args.items() if key != 'page' and value}
+    try:
+        query = filtered_query(table, filters)
+    except ValueError:
+        flash('Invalid filter value.')
+        return redirect(url_for('admin.browse_table', table_name=table_name))
+
+    rows, total = paginate(query, page, current_app.config['ADMIN_ROWS_PER_PAGE'])
+    next_url = url_for('admin.browse_table', table_name=table_name, page=page + 1, **filters) \
+        if page * current_app.config['ADMIN_ROWS_PER_PAGE'] < total else None
+    prev_url = url_for('admin.browse_table', table_name=table_name, page=page - 1, **filters) \
+        if page > 1 else None
+    return render_template('admin_table.html', title=f'Admin - {table_name}', table=table, rows=rows,
+                           total=total, page=page, filters=filters, next_url=next_url, prev_url=prev_url)
+
+@bp.route('/<table_name>/export.<fmt>')
+@login_required
+@admin_required
+def export_table(table_name, fmt):
+    table = ADMIN_TABLES.get(table_name)
+    if table is None:
+        abort(404)
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    exporter, mimetype = EXPORT_FORMATS[fmt]
+    try:
+        query = filtered_query(table, request.args)
+    except ValueError:
+        abort(400)
+    return Response(stream_with_context(exporter(table, query)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={table_name}.{fmt}'})
+
+@bp.route('/metrics')
+@login_required
+@admin_required
+def endpoint_metrics():
+    if request.args.get('reset'):
+        metrics.reset()
+    return jsonify(metrics.snapshot())
@@ -0,0 +1,219 @@
+from app import db
+from app.models import Family, Feeding, FeedingArchive, Changing, Sleeping, Note, Baby, users_families, encode_cursor, decode_cursor, \
+    FEEDING_COLUMNS, serialize_row
+from app.predictions import get_predictions
+from app.sync import SyncError, apply_changes, validate_changes
+from flask import Blueprint, abort, jsonify, make_response, request
+from flask_login import current_user
+from functools import wraps
+from hashlib import sha1
+import sqlalchemy as sa
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Each resource and the column its timeline is ordered by
+RESOURCES = {
+    'feedings': (Feeding, Feeding.timestamp),
+    'changings': (Changing, Changing.timestamp),
+    'sleepings': (Sleeping, Sleeping.start_timestamp),
+    'notes': (Note, Note.timestamp),
+}
+
+# Resources whose old rows are moved to an archive table, and the columns both tables share
+ARCHIVES = {
+    'feedings': (FeedingArchive, FEEDING_COLUMNS),
+}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def api_login_required(func):
+    """Like login_required, but answers 401 instead of redirecting to the login page."""
+    @wraps(func)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401)
+        return func(*args, **kwargs)
+    return decorated_function
+
+@bp.errorhandler(400)
+@bp.errorhandler(401)
+@bp.errorhandler(404)
+def json_error(error):
+    return jsonify(error=error.name, message=error.description), error.code
+
+def parse_since(token):
+    """Parse a sync token: 'v' means everything after version v, 'v.id' resumes a page inside version v."""
+    version, _, row_id = token.partition('.')
+    try:
+        return int(version), int(row_id) if row_id else None
+    except ValueError:
+        abort(400, description='Invalid since token.')
+
+def get_family_version(family_id):
+    """Load the (id, data_version, data_updated_at) of one of the current user's families, or 404."""
+    family = db.session.execute(
+        sa.select(Family.id, Family.data_version, Family.data_updated_at)
+        .join(users_families)
+        .where(Family.id == family_id, users_families.c.user_id == current_user.id)
+    ).first()
+    if family is None:
+        abort(404)
+    return family
+
+def not_modified(etag, last_modified):
+    """True if the client's conditional headers show it already has this version."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+@bp.route('/families')
+@api_login_required
+def families():
+    rows = db.session.execute(
+        sa.select(Family.id, Family.name, Family.data_version)
+        .join(users_families).where(users_families.c.user_id == current_user.id)
+        .order_by(users_families.c.id)
+    ).all()
+    return jsonify(families=[serialize_row(row) for row in rows])
+
+@bp.route('/families/<int:family_id>/predictions')
+@api_login_required
+def predictions(family_id):
+    """Next-feed predictions and recent daily volumes for each of a family's babies."""
+    family = get_family_version(family_id)
+    etag = f'family-{family.id}-v{family.data_version}-predictions'
+    if not_modified(etag, family.data_updated_at):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    babies = db.session.execute(
+        sa.select(Baby.id, Baby.name).where(Baby.family_id == family.id).order_by(Baby.id)
+    ).all()
+    predictions = get_predictions([baby.id for baby in babies])
+    response = jsonify(predictions=[{'baby_id': baby.id, 'name': baby.name, 'prediction': prediction}
+                                    for baby, prediction in zip(babies, predictions)])
+    response.set_etag(etag, weak=True)
+    response.last_modified = family.data_updated_at
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def fetch_records(resource, family_id, since=None, before=None, baby_id=None, limit=DEFAULT_LIMIT):
+    """One page of a family's records: changes after a parsed sync token, or newest first before a cursor.
+
+    Returns (rows, has_more).
+    """
+    model, time_column = RESOURCES[resource]
+    time_column_name = time_column.key
+
+    def fetch(table):
+        query = sa.select(table).join(Baby, table.c.baby_id == Baby.id).where(Baby.family_id == family_id)
+        if baby_id is not None:
+            query = query.where(table.c.baby_id == baby_id)
+        time_column = table.c[time_column_name]
+        if since is not None:
+            version, row_id = since
+            after = table.c.version > version
+            if row_id is not None:
+                after = sa.or_(after, sa.and_(table.c.version == version, table.c.id > row_id))
+            query = query.where(after).order_by(table.c.version, table.c.id)
+        else:
+            if before is not None:
+                timestamp, row_id = before
+                query = query.where(sa.or_(time_column < timestamp, sa.and_(time_column == timestamp, table.c.id < row_id)))
+            query = query.order_by(time_column.desc(), table.c.id.desc())
+        return db.session.execute(query.limit(limit + 1)).all()
+
+    rows = fetch(model.__table__)
+    if resource in ARCHIVES:
+        # Syncs must see every row; timeline pages only need the archive once they reach back past its horizon
+        if since is not None or len(rows) <= limit or rows[-1]._mapping[time_column_name] < FeedingArchive.horizon():
+            archive, columns = ARCHIVES[resource]
+            rows = fetch(sa.union_all(*(
+                sa.select(*[table.c[name] for name in columns]) for table in (model.__table__, archive.__table__)
+            )).subquery(resource))
+    return rows[:limit], len(rows) > limit
+
+def next_since_token(rows, has_more, data_version):
+    """Where the next sync should resume: inside the last version returned, or after everything."""
+    return f'{rows[-1].version}.{rows[-1].id}' if has_more else str(data_version)
+
+
+@bp.route('/families/<int:family_id>/<resource>')
+@api_login_required
+def family_records(family_id, resource):
+    """List a family's records newest first (`cursor=` pages back), or changes after a sync token (`since=`)."""
+    if resource not in RESOURCES:
+        abort(404)
+    _, time_column = RESOURCES[resource]
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    since = request.args.get('since')
+    cursor = request.args.get('cursor')
+    baby_id = request.args.get('baby_id', type=int)
+
+    # Read the version before the records so nothing written after it can be missed by the next sync
+    family = get_family_version(family_id)
+    # The same family version gives a different body per resource and query, so they get different ETags
+    query = sha1(f'{resource}?limit={limit}&since={since}&cursor={cursor}&baby_id={baby_id}'.encode()).hexdigest()[:16]
+    etag = f'family-{family.id}-v{family.data_version}-{query}'
+    if not_modified(etag, family.data_updated_at):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    rows, has_more = fetch_records(
+        resource, family.id,
+        since=parse_since(since) if since is not None else None,
+        before=decode_cursor(cursor),
+        baby_id=baby_id,
+        limit=limit,
+    )
+
+    body = {'items': [serialize_row(row) for row in rows], 'version': family.data_version, 'has_more': has_more}
+    if since is not None:
+        body['next_since'] = next_since_token(rows, has_more, family.data_version)
+    else:
+        last = rows[-1] if rows else None
+        body['next_cursor'] = encode_cursor(last._mapping[time_column.key], last.id) if has_more else None
+
+    response = jsonify(body)
+    response.set_etag(etag, weak=True)
+    response.last_modified = family.data_updated_at
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/families/<int:family_id>/sync', methods=['POST'])
+@api_login_required
+def sync(family_id):
+    """Upload records created offline and download everything changed since the client's last sync.
+
+    The body is {"since": token, "changes": {"feedings": [...], "changings": [...], "sleepings": [...]}},
+    where every record carries a client-generated `client_id` UUID, so a retried batch is applied only once.
+    """
+    # Only JSON bodies are accepted, which a cross-site form post cannot send, so no CSRF token is needed
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description='Expected a JSON object.')
+    since = parse_since(str(body.get('since', '0')))
+    family = get_family_version(family_id)
+
+    try:
+        written = apply_changes(validate_changes(body.get('changes', {}), family.id), family.id, current_user.id)
+    except SyncError as e:
+        return jsonify(error='Bad Request', message='Invalid records; nothing was saved.', errors=e.errors), 400
+
+    family = get_family_version(family_id)
+    changes = {}
+    for resource in RESOURCES:
+        rows, has_more = fetch_records(resource, family.id, since=since, limit=MAX_LIMIT)
+        changes[resource] = {
+            'items': [serialize_row(row) for row in rows],
+            'has_more': has_more,
+            'next_since': next_since_token(rows, has_more, family.data_version),
+        }
+    return jsonify(version=family.data_version, written=written, changes=changes)
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from flask import current_app, g, has_app_context
+import threading
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A small thread-safe in-process cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._evict()
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        """Drop expired entries, or the oldest entry if none have expired."""
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._data.items() if expires < now]
+        for key in expired or [next(iter(self._data))]:
+            del self._data[key]
+
+
+class LRUCache:
+    """A thread-safe cache holding at most `maxsize` entries, evicting the least recently used.
+
+    Entries optionally expire `ttl` seconds after being set.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+context_cache = TTLCache()
+
+
+def cached(key, loader):
+    """Return the value for `key`, checking the current request first, then the TTL cache, then `loader()`."""
+    memo = g.setdefault('context_cache', {}) if has_app_context() else {}
+    value = memo.get(key, _MISSING)
+    if value is _MISSING:
+        value = context_cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            context_cache.set(key, value, current_app.config['CONTEXT_CACHE_TTL'])
+        memo[key] = value
+    return value
+
+def cached_many(keys, loader):
+    """Like cached() for several keys at once: `loader(missing_keys)` returns {key: value} for those not cached."""
+    memo = g.setdefault('context_cache', {}) if has_app_context() else {}
+    values, missing = {}, []
+    for key in keys:
+        value = memo.get(key, _MISSING)
+        if value is _MISSING:
+            value = context_cache.get(key, _MISSING)
+        if value is _MISSING:
+            missing.append(key)
+        else:
+            values[key] = memo[key] = value
+    if missing:
+        loaded = loader(missing)
+        for key in missing:
+            values[key] = memo[key] = loaded.get(key)
+            context_cache.set(key, values[key], current_app.config['CONTEXT_CACHE_TTL'])
+    return [values[key] for key in keys]
+
+def invalidate(*keys):
+    """Forget cached values in both the current request and the shared cache."""
+    memo = g.get('context_cache', {}) if has_app_context() else {}
+    for key in keys:
+        memo.pop(key, None)
+        context_cache.delete(key)
@@ -0,0 +1,116 @@
+from app import db
+from app.models import FeedingArchive, FeedingDailyTotal, RecipeIngredient, RecipeUsage, SearchDocument
+import click
+import json
+from flask import Blueprint, current_app
+
+bp = Blueprint('cli', __name__, cli_group=None)
+
+@bp.cli.group()
+def stats():
+    """Feeding statistics commands."""
+    pass
+
+@stats.command()
+@click.option('--baby-id', 'baby_ids', type=int, multiple=True, help='Only rebuild these babies (repeatable).')
+def rebuild(baby_ids):
+    """Backfill the daily feeding totals from the feedings table."""
+    FeedingDailyTotal.rebuild(list(baby_ids) or None)
+    click.echo('Daily feeding totals rebuilt.')
+
+@stats.command()
+def recipes():
+    """Backfill recipe usage from the feedings and re-index recipe ingredients."""
+    RecipeUsage.rebuild()
+    RecipeIngredient.rebuild()
+    click.echo('Recipe usage and ingredient index rebuilt.')
+
+@bp.cli.group()
+def search():
+    """Search index commands."""
+    pass
+
+@search.command('rebuild')
+def rebuild_search():
+    """Re-index every recipe and note for search."""
+    SearchDocument.rebuild()
+    click.echo(f'Search index rebuilt ({SearchDocument.backend()} backend).')
+
+@bp.cli.command('archive-feedings')
+@click.option('--batch-size', type=int, default=1000, help='Feedings moved per transaction.')
+def archive_feedings(batch_size):
+    """Move feedings older than FEEDING_ARCHIVE_AFTER_DAYS into the archive table."""
+    moved = FeedingArchive.archive_feedings(batch_size=batch_size)
+    click.echo(f'Archived {moved} feedings older than {FeedingArchive.horizon():%Y-%m-%d}.')
+
+@bp.cli.command('import-feedings')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--family-id', type=int, required=True, help='Family the babies and recipes belong to.')
+@click.option('--user-id', type=int, required=True, help='User the feedings are logged as.')
+@click.option('--batch-size', type=int, help='Rows per insert transaction.')
+def import_feedings(path, family_id, user_id, batch_size):
+    """Bulk import feedings from a CSV or JSON file."""
+    from app.importer import import_feedings as run_import, parse_feedings
+    with open(path, encoding='utf-8-sig') as f:
+        rows = parse_feedings(f, path.rsplit('.', 1)[-1].lower())
+
+    result = run_import(rows, family_id, user_id, batch_size=batch_size,
+                        progress=lambda done, total: click.echo(f'Inserted {done}/{total} feedings'))
+    for row_number, errors in result.errors:
+        click.echo(f'Row {row_number}: ' + '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items()), err=True)
+    click.echo(f'Imported {result.inserted} feedings, rejected {len(result.errors)} rows.')
+
+@bp.cli.command('event-broker')
+@click.option('--url', help='Address to listen on (host:port or a Unix socket path). Defaults to EVENT_BROKER_URL.')
+def event_broker(url):
+    """Relay live family events between web worker processes."""
+    from app.events import broker_authkey, parse_address, run_broker
+    url = url or current_app.config['EVENT_BROKER_URL']
+    if not url:
+        raise click.UsageError('Set EVENT_BROKER_URL or pass --url.')
+    authkey = broker_authkey(current_app.config)
+    click.echo(f'Event broker listening on {url}')
+    run_broker(parse_address(url), authkey)
+
+@bp.cli.command('worker')
+@click.option('--concurrency', type=int, default=2, help='Jobs run at once.')
+@click.option('--pool', type=click.Choice(['thread', 'process']), default='thread', help='Run jobs in threads or processes.')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling.')
+def worker(concurrency, pool, once):
+    """Run queued background jobs and keep the periodic ones scheduled."""
+    from app.jobs import run_worker
+    run_worker(concurrency=concurrency, pool=pool, once=once)
+
+@bp.cli.group()
+def jobs():
+    """Background job commands."""
+    pass
+
+@jobs.command()
+@click.argument('name')
+@click.option('--args', 'arguments', default='{}', help='Keyword arguments as a JSON object.')
+def enqueue(name, arguments):
+    """Queue a background job by name."""
+    from app.jobs import TASKS, enqueue as enqueue_job
+    if name not in TASKS:
+        raise click.BadParameter(f'choose from {", ".join(sorted(TASKS))}', param_hint='NAME')
+    job = enqueue_job(name, **json.loads(arguments))
+    click.echo(f'Queued job {job.id} ({name}).')
+
+@bp.cli.command('replicate-sqlite')
+@click.option('--interval', type=float, default=5, help='Seconds between copies.')
+@click.option('--once', is_flag=True, help='Copy once and exit.')
+def replicate_sqlite(interval, once):
+    """Copy the SQLite primary onto each SQLite replica bind, standing in for real replication locally."""
+    import time
+    from app.replicas import copy_sqlite, replica_keys
+    targets = [db.engines[key] for key in replica_keys(current_app) if db.engines[key].dialect.name == 'sqlite']
+    if db.engine.dialect.name != 'sqlite' or not targets:
+        raise click.UsageError('Needs a SQLite primary and at least one SQLite URL in DATABASE_REPLICA_URLS.')
+    while True:
+        for target in targets:
+            copy_sqlite(db.engine, target)
+        click.echo(f'Copied to {len(targets)} replica(s).')
+        if once:
+            return
+        time.sleep(interval)
@@ -0,0 +1,22 @@
+from app import db
+import sqlalchemy as sa
+
+
+def init_app(app):
+    """Apply the configured engine profile's per-connection SQLite PRAGMAs to the primary and any replicas."""
+    pragmas = app.config['SQLITE_PRAGMAS']
+    if not pragmas:
+        return
+
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            sa.event.listen(engine, 'connect', set_sqlite_pragmas)
@@ -0,0 +1,206 @@
+from collections import defaultdict
+from config import ConfigError, DEFAULT_SECRET_KEY
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+
+class TooManySubscribers(Exception):
+    """Raised when this worker is already streaming to its maximum number of clients."""
+    pass
+
+
+class LocalBroker:
+    """In-process pub/sub: events published for a family reach every subscriber in this worker.
+
+    With `max_subscribers`, subscribing beyond that many open subscriptions raises TooManySubscribers.
+    """
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._count = 0
+
+    def subscribe(self, family_id):
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.max_subscribers is not None and self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscribers[family_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, family_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(family_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscribers[family_id]
+
+    def publish(self, family_id, event):
+        self._deliver(family_id, event)
+
+    def _deliver(self, family_id, event):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(family_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # A stalled client shouldn't hold up everyone else; it can resync from the API
+                logger.warning('Dropping event for a slow subscriber of family %s', family_id)
+
+
+class SocketBroker(LocalBroker):
+    """Fans events out across worker processes through a `flask event-broker` process.
+
+    Published events go to the broker, which pushes them to every connected worker (this one
+    included) for local delivery. If the broker can't be reached, events are delivered locally only.
+    Messages are JSON, never pickles, so a peer that knows the authkey still can't run code here.
+    """
+
+    def __init__(self, address, authkey, max_subscribers=None):
+        super().__init__(max_subscribers)
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._receiver = None
+
+    def _connect(self):
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            return self._conn
+
+    def _ensure_receiver(self):
+        with self._conn_lock:
+            if self._receiver is None:
+                self._receiver = threading.Thread(target=self._receive, daemon=True)
+                self._receiver.start()
+
+    def _disconnect(self):
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _receive(self):
+        delay = 1
+        while True:
+            try:
+                family_id, event = json.loads(self._connect().recv_bytes(MAX_MESSAGE_BYTES))
+                self._deliver(family_id, event)
+                delay = 1
+            except (ValueError, TypeError) as e:
+                logger.warning('Ignoring malformed event broker message: %s', e)
+            except (OSError, EOFError):
+                self._disconnect()
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+            except AuthenticationError as e:
+                # Usually a SECRET_KEY that differs from the broker's; keep the thread alive and retry
+                logger.error('Event broker rejected this worker: %s', e)
+                self._disconnect()
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def subscribe(self, family_id):
+        self._ensure_receiver()
+        return super().subscribe(family_id)
+
+    def publish(self, family_id, event):
+        self._ensure_receiver()
+        try:
+            conn = self._connect()
+            with self._conn_lock:
+                conn.send_bytes(json.dumps([family_id, event]).encode('utf-8'))
+        except (OSError, EOFError, AuthenticationError) as e:
+            logger.warning('Event broker unavailable (%s), delivering family %s event locally', e, family_id)
+            self._disconnect()
+            self._deliver(family_id, event)
+
+
+def parse_address(url):
+    """'host:port' for TCP, anything else is a Unix socket path."""
+    host, _, port = url.rpartition(':')
+    if host and port.isdigit() and not url.startswith('/'):
+        return host, int(port)
+    return url
+
+def broker_authkey(config):
+    """The key workers and the broker authenticate with; refuses the well-known default SECRET_KEY."""
+    if config['SECRET_KEY'] == DEFAULT_SECRET_KEY:
+        raise ConfigError('Set SECRET_KEY before using EVENT_BROKER_URL; the default key is public.')
+    return config['SECRET_KEY'].encode('utf-8')
+
+def run_broker(address, authkey):
+    """Relay every event received from one worker to all connected workers. Blocks forever.
+
+    Messages are passed on as raw bytes; the broker never decodes them.
+    """
+    connections = set()
+    lock = threading.Lock()
+
+    def relay(conn):
+        try:
+            while True:
+                message = conn.recv_bytes(MAX_MESSAGE_BYTES)
+                with lock:
+                    for target in connections:
+                        try:
+                            target.send_bytes(message)
+                        except OSError:
+                            pass
+        except (OSError, EOFError):
+            pass
+        finally:
+            with lock:
+                connections.discard(conn)
+            conn.close()
+
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logger.warning('Rejected event broker connection: %s', e)
+                continue
+            with lock:
+                connections.add(conn)
+            threading.Thread(target=relay, args=(conn,), daemon=True).start()
+
+
+broker = LocalBroker()
+
+
+def init_app(app):
+    """Switch to the cross-process broker when EVENT_BROKER_URL is configured, and cap open streams."""
+    global broker
+    if app.config['EVENT_BROKER_URL']:
+        broker = SocketBroker(parse_address(app.config['EVENT_BROKER_URL']), broker_authkey(app.config),
+                              app.config['EVENT_MAX_SUBSCRIBERS'])
+    else:
+        broker = LocalBroker(app.config['EVENT_MAX_SUBSCRIBERS'])
+
+def publish(family_id, event_type, data):
+    """Push an event to every member of the family currently listening."""
+    broker.publish(family_id, {'type': event_type, 'data': data})
+
+def subscribe(family_id):
+    return broker.subscribe(family_id)
+
+def unsubscribe(family_id, subscription):
+    broker.unsubscribe(family_id, subscription)
@@ -2,9 +2,10 @@ from app import db
 from app.models import User, Family, Baby, Feeding, Changing, Sleeping, Note, Recipe
 from datetime import datetime
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 import sqlalchemy as sa
 from wtforms import StringField, SelectField, IntegerField, PasswordField, BooleanField, SubmitField, TextAreaField, DateTimeField, DateField
-from wtforms.validators import ValidationError, DataRequired, Email, EqualTo, Length, Optional
+from wtforms.validators import ValidationError, DataRequired, Email, EqualTo, Length, NumberRange, Optional
 
 
 class LoginForm(FlaskForm):
@@ -27,17 +28,11 @@ class RegistrationForm(FlaskForm):
         'Repeat Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Register')
 
-    def validate_username(self, username):
-        user = db.session.scalar(sa.select(User).where(
-            User.username == username.data))
-        if user is not None:
-            raise ValidationError('Please use a different username.')
-
-    def validate_email(self, email):
-        user = db.session.scalar(sa.select(User).where(
-            User.email == email.data))
-        if user is not None:
-            raise ValidationError('Please use a different email address.')
+    # Uniqueness is enforced by the database; register() maps the clash back onto the form
+    DUPLICATE_MESSAGES = {
+        'username': 'Please use a different username.',
+        'email': 'Please use a different email address.',
+    }
 
 class EditFeedingForm(FlaskForm):
     baby_id = SelectField('Baby', coerce=int, validators=[DataRequired()])  # Updated to select baby
@@ -46,7 +41,7 @@ class EditFeedingForm(FlaskForm):
     bottle_amount = IntegerField('Bottle Amount (ml)', validators=[Optional()])
     solid_amount = IntegerField('Solid Amount (g)', validators=[Optional()])
     recipe_id = SelectField('Recipe', coerce=int, validators=[Optional()])  # No default empty choices needed
-    timestamp = DateTimeField('Feeding Time',format='%Y-%m-%dT%H:%M',default=datetime.now,validators=[DataRequired()])
+    timestamp = DateTimeField('Feeding Time',format=['%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'],default=datetime.now,validators=[DataRequired()])
     submit = SubmitField('Submit')
 
     def __init__(self, babies=[], recipes=[], *args, **kwargs):
@@ -58,6 +53,34 @@ class EditFeedingForm(FlaskForm):
         """Dynamically set recipe choices."""
         self.recipe_id.choices = [(r.id, r.recipe_name) for r in recipes]
 
+class BabyEventForm(FlaskForm):
+    """Base for forms that log something against one of the family's babies."""
+    baby_id = SelectField('Baby', coerce=int, validators=[DataRequired()])
+
+    def __init__(self, babies=[], *args, **kwargs):
+        super(BabyEventForm, self).__init__(*args, **kwargs)
+        self.baby_id.choices = [(baby.id, baby.name) for baby in babies]
+
+class AddChangingForm(BabyEventForm):
+    wet_nappy = BooleanField('Wet Nappy')
+    poop_amount = IntegerField('Poop Amount', validators=[Optional(), NumberRange(min=0)])
+    timestamp = DateTimeField('Changing Time', format=['%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S'], default=datetime.now, validators=[DataRequired()])
+    submit = SubmitField('Submit')
+
+class AddSleepingForm(BabyEventForm):
+    start_timestamp = DateTimeField('Fell Asleep', format=['%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S'], default=datetime.now, validators=[DataRequired()])
+    end_timestamp = DateTimeField('Woke Up', format=['%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S'], validators=[Optional()])
+    submit = SubmitField('Submit')
+
+    def validate_end_timestamp(self, end_timestamp):
+        if end_timestamp.data and self.start_timestamp.data and end_timestamp.data < self.start_timestamp.data:
+            raise ValidationError('Wake up time must be after the time they fell asleep.')
+
+class AddNoteForm(BabyEventForm):
+    extra = TextAreaField('Note', validators=[DataRequired(), Length(max=2000)])
+    timestamp = DateTimeField('Time', format=['%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S'], default=datetime.now, validators=[DataRequired()])
+    submit = SubmitField('Submit')
+
 class AddBabyForm(FlaskForm):
     baby_name = StringField('Baby Name', validators=[Optional()])
     baby_dob = DateField('Date of Birth', format='%Y-%m-%d', default=datetime.now)
@@ -73,3 +96,7 @@ class AddRecipeForm(FlaskForm):
     recipe_instructions = TextAreaField('Recipe Instructions', validators=[Optional()])
     amount = IntegerField('Amount', validators=[Optional()])
     submit = SubmitField('Submit')
+
+class ImportFeedingsForm(FlaskForm):
+    feedings_file = FileField('Feedings File (CSV or JSON)', validators=[FileRequired(), FileAllowed(['csv', 'json'], 'CSV or JSON files only!')])
+    submit = SubmitField('Import')
@@ -0,0 +1,133 @@
+from app.cache import LRUCache
+import hashlib
+import os
+import tempfile
+import time
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+def make_key(parts):
+    """Join the parts of a `{% cache %}` tag into a single string key."""
+    return ':'.join(str(part) for part in parts)
+
+
+class MemoryBackend:
+    """Keep rendered fragments in a per-process LRU cache."""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class FileSystemBackend:
+    """Keep rendered fragments as files in a directory, so worker processes share them.
+
+    Entries older than `ttl` seconds (by file mtime) are treated as missing.
+    """
+
+    def __init__(self, directory, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.html')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl < time.time():
+                return None
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        # Write to a temporary file and rename it so readers never see half a fragment
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.html'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class FragmentCacheExtension(Extension):
+    """Adds `{% cache part, ... %}...{% endcache %}` to templates.
+
+    The body is rendered once per key and then served from `environment.fragment_cache`.
+    Keys should include the version of whatever the fragment shows, so a write naturally
+    moves the fragment to a new key; `invalidate()` drops a key explicitly.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render_cached', [nodes.List(parts)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render_cached(self, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = make_key(parts)
+        value = cache.get(key)
+        if value is None:
+            value = str(caller())
+            cache.set(key, value)
+        return Markup(value)
+
+
+def create_backend(app):
+    backend = app.config['FRAGMENT_CACHE_BACKEND']
+    ttl = app.config['FRAGMENT_CACHE_TTL']
+    if backend == 'memory':
+        return MemoryBackend(maxsize=app.config['FRAGMENT_CACHE_SIZE'], ttl=ttl)
+    if backend == 'filesystem':
+        return FileSystemBackend(app.config['FRAGMENT_CACHE_DIR'], ttl=ttl)
+    if backend in (None, '', 'none'):
+        return None
+    raise ValueError(f'Unknown fragment cache backend: {backend}')
+
+def init_app(app):
+    """Register the `{% cache %}` tag and attach the configured backend to the Jinja environment."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = create_backend(app)
+
+def invalidate(app, *parts):
+    """Drop the fragment cached under the given key parts."""
+    cache = app.jinja_env.fragment_cache
+    if cache is not None:
+        cache.delete(make_key(parts))
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+import threading
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Parameters werkzeug fills in when a method leaves them out
+METHOD_DEFAULTS = {
+    'scrypt': [str(2 ** 15), '8', '1'],
+    'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+}
+
+
+def full_method(method):
+    """A werkzeug method string with every parameter spelled out, as it is stored in a hash."""
+    name, *params = method.split(':')
+    defaults = METHOD_DEFAULTS.get(name, [])
+    return ':'.join([name, *params, *defaults[len(params):]])
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+    pass
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded process pool so bursts of logins don't tie up request threads.
+
+    With PASSWORD_HASH_WORKERS = 0 hashing runs inline, which is handy for the CLI and tests.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.full_method = full_method(self.method)
+        self.salt_length = app.config['PASSWORD_HASH_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_QUEUE_DEPTH'])
+
+    def _get_executor(self):
+        # Created on first use so each forked gunicorn worker gets its own pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self._get_executor().submit(func, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if `pwhash` was made with different parameters than the configured ones."""
+        return full_method(pwhash.split('$', 1)[0]) != self.full_method
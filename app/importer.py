@@ -0,0 +1,137 @@
+from app import db
+from app.cache import invalidate
+from app.forms import EditFeedingForm, ImportFeedingsForm
+from app.models import Baby, Family, Feeding, FeedingDailyTotal, Recipe, RecipeUsage
+from contextlib import nullcontext
+import csv
+from flask import Blueprint, current_app, flash, has_request_context, render_template
+from flask_login import current_user, login_required
+import io
+import json
+import sqlalchemy as sa
+from werkzeug.datastructures import MultiDict
+
+bp = Blueprint('imports', __name__)
+
+FEEDING_FIELDS = ['baby_id', 'feeding_type', 'timestamp', 'breast_duration', 'bottle_amount', 'solid_amount', 'recipe_id']
+
+
+class ImportResult:
+    """Outcome of a bulk import: how many rows were inserted and why the others were rejected."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []  # (row number, {field: [messages]})
+
+    def add_error(self, row_number, errors):
+        self.errors.append((row_number, errors))
+
+
+def parse_feedings(stream, fmt):
+    """Read feeding rows from a CSV or JSON text stream into a list of dicts."""
+    if fmt == 'csv':
+        return list(csv.DictReader(stream))
+    if fmt == 'json':
+        data = json.load(stream)
+        rows = data.get('feedings', []) if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('Expected a list of feeding objects.')
+        return rows
+    raise ValueError(f'Unsupported import format: {fmt}')
+
+def _lookup(model, name_column, family_id):
+    """Map names (lowercased) and ids to ids for every row of `model` in the family, in one query."""
+    rows = db.session.execute(
+        sa.select(model.id, name_column).where(model.family_id == family_id)
+    ).all()
+    return rows, {name.strip().lower(): row_id for row_id, name in rows}
+
+def validate_feedings(rows, family_id, result):
+    """Resolve baby/recipe names and validate each row with EditFeedingForm.
+
+    Returns the insertable values; rejected rows are recorded on `result`.
+    """
+    babies, baby_ids = _lookup(Baby, Baby.name, family_id)
+    recipes, recipe_ids = _lookup(Recipe, Recipe.recipe_name, family_id)
+    baby_choices = [(baby_id, name) for baby_id, name in babies]
+    recipe_choices = [(recipe_id, name) for recipe_id, name in recipes]
+
+    valid = []
+    # Row 1 is the CSV header, so data rows are numbered from 2 in either format for consistency
+    for row_number, row in enumerate(rows, 2):
+        row = {key.strip(): str(value).strip() for key, value in row.items() if key and value not in (None, '')}
+        errors = {}
+        if 'baby' in row and 'baby_id' not in row:
+            if row['baby'].lower() in baby_ids:
+                row['baby_id'] = str(baby_ids[row['baby'].lower()])
+            else:
+                errors['baby'] = [f"Unknown baby '{row['baby']}'."]
+        if 'recipe' in row and 'recipe_id' not in row:
+            if row['recipe'].lower() in recipe_ids:
+                row['recipe_id'] = str(recipe_ids[row['recipe'].lower()])
+            else:
+                errors['recipe'] = [f"Unknown recipe '{row['recipe']}'."]
+
+        form = EditFeedingForm(formdata=MultiDict(row), meta={'csrf': False})
+        form.baby_id.choices = baby_choices
+        form.recipe_id.choices = recipe_choices
+        if not form.validate():
+            # Don't repeat "required" errors for ids we already failed to resolve from a name
+            unresolved = {'baby_id' if 'baby' in errors else None, 'recipe_id' if 'recipe' in errors else None}
+            errors.update({field: messages for field, messages in form.errors.items() if field not in unresolved})
+        if errors:
+            result.add_error(row_number, errors)
+            continue
+        valid.append({field: getattr(form, field).data for field in FEEDING_FIELDS})
+    return valid
+
+def import_feedings(rows, family_id, user_id, batch_size=None, progress=None):
+    """Validate and bulk insert feedings for a family, one transaction per batch.
+
+    `progress`, if given, is called with (rows done, rows to insert) after each batch.
+    """
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    result = ImportResult()
+    with nullcontext() if has_request_context() else current_app.test_request_context():
+        valid = validate_feedings(rows, family_id, result)
+
+    for start in range(0, len(valid), batch_size):
+        _, version = Family.bump_data_version(family_id=family_id)
+        batch = [dict(values, user_id=user_id, version=version) for values in valid[start:start + batch_size]]
+        db.session.execute(sa.insert(Feeding), batch)
+        db.session.commit()
+        result.inserted += len(batch)
+        if progress:
+            progress(result.inserted, len(valid))
+
+    if valid:
+        baby_ids = list({values['baby_id'] for values in valid})
+        FeedingDailyTotal.rebuild(baby_ids)
+        recipe_ids = list({values['recipe_id'] for values in valid if values['recipe_id']})
+        if recipe_ids:
+            RecipeUsage.rebuild(recipe_ids)
+        invalidate(('recipe-usage', family_id), *(('prediction', baby_id) for baby_id in baby_ids))
+    return result
+
+def read_upload(file_storage):
+    """Decode an uploaded CSV/JSON file into feeding rows, picking the format from its extension."""
+    fmt = file_storage.filename.rsplit('.', 1)[-1].lower()
+    return parse_feedings(io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig'), fmt)
+
+@bp.route('/import_feedings', methods=['GET', 'POST'])
+@login_required
+def upload_feedings():
+    _, families, family = Family.get_user_families_and_family()
+    form = ImportFeedingsForm()
+    result = None
+
+    if form.validate_on_submit() and family:
+        try:
+            rows = read_upload(form.feedings_file.data)
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Could not read the file: {e}', 'error')
+        else:
+            result = import_feedings(rows, family.id, current_user.id)
+            flash(f'Imported {result.inserted} feedings ({len(result.errors)} rows rejected).')
+
+    return render_template('import_feedings.html', title='Import Feedings', families=families, family=family, form=form, result=result)
@@ -0,0 +1,155 @@
+from app import db
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import g, has_request_context, request, before_render_template, template_rendered
+import heapq
+import logging
+import sqlalchemy as sa
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 5
+
+
+class QueryCounter:
+    """Records every statement executed on an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        sa.event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        sa.event.remove(self.engine, 'before_cursor_execute', self._record)
+
+
+def count_queries(engine=None):
+    """Count the queries run inside a `with` block (needs an app context)."""
+    return QueryCounter(engine or db.engine)
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with the offending statements if the block runs more than `limit` queries."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = '\n'.join(counter.statements)
+        raise AssertionError(f'Expected at most {limit} queries, got {counter.count}:\n{statements}')
+
+
+class EndpointMetrics:
+    """Running per-endpoint totals of requests, queries, DB time and render time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = defaultdict(lambda: {
+            'requests': 0, 'queries': 0, 'max_queries': 0,
+            'db_ms': 0.0, 'render_ms': 0.0, 'total_ms': 0.0, 'slowest': [],
+        })
+
+    def record(self, endpoint, queries, total_ms, render_ms):
+        db_ms = sum(duration for duration, _ in queries)
+        with self._lock:
+            stats = self._data[endpoint]
+            stats['requests'] += 1
+            stats['queries'] += len(queries)
+            stats['max_queries'] = max(stats['max_queries'], len(queries))
+            stats['db_ms'] += db_ms
+            stats['render_ms'] += render_ms
+            stats['total_ms'] += total_ms
+            stats['slowest'] = heapq.nlargest(SLOWEST_KEPT, stats['slowest'] + queries)
+
+    def snapshot(self):
+        """Return a JSON-friendly copy of the metrics with per-request averages."""
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._data.items():
+                n = stats['requests']
+                result[endpoint] = {
+                    'requests': n,
+                    'avg_queries': round(stats['queries'] / n, 2),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_ms': round(stats['db_ms'] / n, 2),
+                    'avg_render_ms': round(stats['render_ms'] / n, 2),
+                    'avg_total_ms': round(stats['total_ms'] / n, 2),
+                    'slowest': [{'ms': round(ms, 2), 'statement': sql} for ms, sql in stats['slowest']],
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+metrics = EndpointMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_queries' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_queries' in g and conn.info.get('query_start'):
+        elapsed = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+        g.sql_queries.append((elapsed, statement))
+
+def _before_render(sender, template, context, **extra):
+    if 'sql_queries' in g:
+        g.render_start = time.perf_counter()
+
+def _after_render(sender, template, context, **extra):
+    if 'sql_queries' in g and 'render_start' in g:
+        g.render_ms += (time.perf_counter() - g.pop('render_start')) * 1000
+
+
+def init_app(app):
+    """Hook SQL timing and per-endpoint metrics into the engine and request lifecycle."""
+    if not app.config['SQL_PROFILING']:
+        return
+
+    sa.event.listen(sa.engine.Engine, 'before_cursor_execute', _before_cursor_execute)
+    sa.event.listen(sa.engine.Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_profiling():
+        g.sql_queries = []
+        g.render_ms = 0.0
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def finish_profiling(response):
+        if 'sql_queries' not in g:
+            return response
+        total_ms = (time.perf_counter() - g.request_start) * 1000
+        queries = g.sql_queries
+        db_ms = sum(duration for duration, _ in queries)
+        endpoint = request.endpoint or 'unknown'
+        metrics.record(endpoint, queries, total_ms, g.render_ms)
+
+        if app.debug:
+            response.headers['X-DB-Profile'] = (
+                f'queries={len(queries)}; db={db_ms:.1f}ms; render={g.render_ms:.1f}ms; total={total_ms:.1f}ms')
+
+        budget = app.config['QUERY_BUDGET']
+        if len(queries) > budget:
+            logger.warning('%s ran %d queries (budget %d)', endpoint, len(queries), budget)
+        if total_ms > app.config['SLOW_REQUEST_MS']:
+            slowest = heapq.nlargest(SLOWEST_KEPT, queries)
+            logger.warning('Slow request %s %s: %.1fms total, %d queries, %.1fms in DB; slowest: %s',
+                           request.method, request.path, total_ms, len(queries), db_ms,
+                           '; '.join(f'{ms:.1f}ms {sql}' for ms, sql in slowest))
+        return response
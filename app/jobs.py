@@ -0,0 +1,188 @@
+from app import db
+from app.models import FeedingArchive, FeedingDailyTotal, Job, RecipeIngredient, RecipeUsage, SearchDocument
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from flask import current_app
+import json
+import logging
+import os
+import socket
+import sqlalchemy as sa
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a job that can be enqueued by `name`; its return value is stored as the job result."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+@task('rebuild-daily-totals')
+def rebuild_daily_totals(baby_ids=None):
+    FeedingDailyTotal.rebuild(baby_ids)
+
+@task('rebuild-recipe-usage')
+def rebuild_recipe_usage(recipe_ids=None):
+    RecipeUsage.rebuild(recipe_ids)
+    RecipeIngredient.rebuild()
+
+@task('rebuild-search-index')
+def rebuild_search_index():
+    SearchDocument.rebuild()
+
+@task('archive-feedings')
+def archive_feedings(batch_size=1000):
+    return {'archived': FeedingArchive.archive_feedings(batch_size=batch_size)}
+
+
+def enqueue(name, run_at=None, max_attempts=None, unique_key=None, **kwargs):
+    """Queue `name` to run with keyword arguments `kwargs` at `run_at` (default now) and commit.
+
+    With `unique_key`, nothing is queued if a job with that key is already pending; returns None then.
+    """
+    if name not in TASKS:
+        raise ValueError(f'Unknown job: {name}')
+    job = Job(name=name, args=json.dumps(kwargs), run_at=run_at or datetime.utcnow(), unique_key=unique_key,
+              max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'])
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except sa.exc.IntegrityError:
+        db.session.rollback()
+        return None
+    return job
+
+def claim_job(worker_id):
+    """Atomically take the next due job (or one whose worker's lease ran out) and mark it running.
+
+    Returns (id, name, args) or None when nothing is due.
+    """
+    now = datetime.utcnow()
+    due = sa.or_(
+        sa.and_(Job.status == 'queued', Job.run_at <= now),
+        sa.and_(Job.status == 'running', Job.locked_until < now),
+    )
+    # SKIP LOCKED lets Postgres workers pass over each other's rows; SQLite serialises writers anyway
+    candidate = sa.select(Job.id).where(due).order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True)
+    row = db.session.execute(
+        sa.update(Job)
+        .where(Job.id == candidate.scalar_subquery(), due)
+        .values(status='running', attempts=Job.attempts + 1, started_at=now, locked_by=worker_id,
+                locked_until=now + timedelta(seconds=current_app.config['JOB_LEASE_SECONDS']))
+        .returning(Job.id, Job.name, Job.args)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return tuple(row) if row else None
+
+def finish_job(job_id, result=None, error=None):
+    """Record a job's outcome, scheduling a retry with exponential backoff while attempts remain."""
+    job = db.session.get(Job, job_id)
+    now = datetime.utcnow()
+    job.locked_by = job.locked_until = None
+    if error is None:
+        job.status, job.result, job.error, job.finished_at = 'done', json.dumps(result), None, now
+    elif job.attempts < job.max_attempts:
+        backoff = current_app.config['JOB_RETRY_BACKOFF_SECONDS'] * 2 ** (job.attempts - 1)
+        job.status, job.error, job.run_at = 'queued', error, now + timedelta(seconds=backoff)
+    else:
+        job.status, job.error, job.finished_at = 'failed', error, now
+    if job.status != 'queued':
+        job.unique_key = None
+    db.session.commit()
+
+def schedule_periodic_jobs():
+    """Make sure every job in JOB_SCHEDULE has its next run queued, an interval after its last one."""
+    for name, interval in current_app.config['JOB_SCHEDULE'].items():
+        unique_key = f'schedule:{name}'
+        if db.session.scalar(sa.select(Job.id).where(Job.unique_key == unique_key)) is not None:
+            continue
+        last_run = db.session.scalar(sa.select(sa.func.max(Job.finished_at)).where(Job.name == name, Job.status == 'done'))
+        run_at = last_run + timedelta(seconds=interval) if last_run else datetime.utcnow()
+        enqueue(name, run_at=run_at, unique_key=unique_key)
+
+def run_task(name, args):
+    """Run one task in the current app context."""
+    return TASKS[name](**json.loads(args))
+
+_process_app = None
+
+def _init_process(config):
+    """Pool process initializer: build this process's app from the worker app's settings."""
+    global _process_app
+    from app import create_app
+    _process_app = create_app(type('WorkerConfig', (), config))
+
+def _run_in_process(name, args):
+    """Pool process entry point: run the task inside the app _init_process built."""
+    with _process_app.app_context():
+        try:
+            return run_task(name, args)
+        finally:
+            db.session.remove()
+
+def _run_in_thread(app, name, args):
+    with app.app_context():
+        try:
+            return run_task(name, args)
+        finally:
+            db.session.remove()
+
+def run_worker(concurrency=2, pool='thread', once=False):
+    """Claim and run jobs until interrupted (or, with `once`, until nothing is due)."""
+    app = current_app._get_current_object()
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    poll = app.config['JOB_POLL_SECONDS']
+    # Processes sidestep the GIL for CPU-heavy jobs; threads are cheaper and share the engine's pool
+    if pool == 'process':
+        # Each process rebuilds the app from this worker's config, not the default Config
+        executor = ProcessPoolExecutor(concurrency, initializer=_init_process, initargs=(dict(app.config),))
+        submit = lambda name, args: executor.submit(_run_in_process, name, args)
+    else:
+        executor, submit = ThreadPoolExecutor(concurrency), lambda name, args: executor.submit(_run_in_thread, app, name, args)
+
+    running = {}
+    logger.info('Worker %s started with %d %s(s)', worker_id, concurrency, pool)
+    try:
+        while True:
+            if not once:
+                schedule_periodic_jobs()
+            while len(running) < concurrency:
+                job = claim_job(worker_id)
+                if job is None:
+                    break
+                job_id, name, args = job
+                if name not in TASKS:
+                    finish_job(job_id, error=f'Unknown job: {name}')
+                    continue
+                running[submit(name, args)] = job_id
+
+            if not running:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+            done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                _record(running.pop(future), future)
+    finally:
+        # On shutdown, let the jobs in flight finish and record them rather than waiting for their leases to expire
+        for future, job_id in running.items():
+            _record(job_id, future)
+        executor.shutdown(wait=True)
+
+def _record(job_id, future):
+    try:
+        result = future.result()
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s failed: %s', job_id, error.strip().splitlines()[-1])
+        finish_job(job_id, error=error)
+    else:
+        finish_job(job_id, result=result)
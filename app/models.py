@@ -1,14 +1,100 @@
-from app import db, login
-from datetime import datetime
-from flask import request
+from app import db, events, login, hasher
+from app.cache import LRUCache, cached, invalidate
+import base64
+from datetime import date, datetime, timedelta
+from flask import current_app, request
 from flask_login import UserMixin, current_user
+import functools
 from hashlib import md5
 from typing import Optional
-import random
+import re
+import secrets
 import string
 import sqlalchemy as sa
 import sqlalchemy.orm as so
-from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def encode_cursor(timestamp, row_id):
+    """Build an opaque keyset cursor from the last row of a page."""
+    raw = f'{timestamp.isoformat()}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into a (timestamp, id) pair, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def violated_unique_column(error):
+    """Best-effort name of the unique column an IntegrityError tripped over (SQLite and Postgres wording)."""
+    message = str(error.orig)
+    for table, column in (('users', 'username'), ('users', 'email'), ('families', 'code')):
+        if f'{table}.{column}' in message or f'({column})=' in message:
+            return column
+    return None
+
+
+class DuplicateUserError(Exception):
+    """A new user clashed with an existing one on a unique column."""
+
+    def __init__(self, field):
+        super().__init__(f'Duplicate value for {field}')
+        self.field = field
+
+
+def serialize_row(row):
+    """A result row as a dict of JSON-friendly values."""
+    return {key: value.isoformat() if isinstance(value, (date, datetime)) else value
+            for key, value in row._asdict().items()}
+
+
+class Versioned:
+    """Mixin for records that clients sync incrementally: `version` is the family data version that wrote them."""
+
+    version: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0', index=True)
+
+    def to_dict(self):
+        """Column values as JSON-friendly types, for the API and live events."""
+        return {column.key: value.isoformat() if isinstance(value, (date, datetime)) else value
+                for column in self.__table__.columns for value in [getattr(self, column.key)]}
+
+
+class ClientKeyed:
+    """Mixin for records offline clients create: `client_id` is the client-generated UUID that makes retried syncs idempotent."""
+
+    client_id: so.Mapped[Optional[str]] = so.mapped_column(sa.String(36), unique=True)
+
+
+def encode_event_cursor(timestamp, kind, row_id):
+    """Keyset cursor for the merged event timeline, where ids are only unique per kind."""
+    return encode_cursor(timestamp, f'{kind}.{row_id}')
+
+def decode_event_cursor(cursor):
+    """Turn an event cursor back into (timestamp, kind, id), or None if it is missing or malformed."""
+    try:
+        raw = base64.urlsafe_b64decode((cursor or '').encode('ascii')).decode('utf-8')
+        timestamp, key = raw.rsplit('|', 1)
+        kind, row_id = key.split('.', 1)
+        return datetime.fromisoformat(timestamp), kind, int(row_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+FAMILY_CODE_CHARS = string.ascii_letters + string.digits
+FAMILY_CODE_PATTERN = re.compile(r'[A-Za-z0-9]{1,100}')
+FAMILY_CODE_RETRIES = 3
+INGREDIENT_SEPARATORS = re.compile(r'[,;\n]|\band\b|&')
+INGREDIENT_QUANTITY = re.compile(r'^[\d/.½¼¾\s-]+(g|kg|ml|l|oz|lb|tbsp|tsp|cups?|pinch(es)?)?\b\s*(of\s+)?')
+_UNKNOWN = object()
+
+# code -> family id, or None for codes known not to exist
+family_code_cache = LRUCache(maxsize=10000, ttl=600)
 
 
 # User-Family Association Table
@@ -27,6 +113,9 @@ class Family(db.Model):
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     name: so.Mapped[str] = so.mapped_column(sa.String(100))
     code: so.Mapped[str] = so.mapped_column(sa.String(100), unique=True)
+    # Bumped on every write to the family's tracked records; drives API ETags and incremental sync
+    data_version: so.Mapped[int] = so.mapped_column(sa.Integer, default=0, server_default='0')
+    data_updated_at: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
 
     users = so.relationship("User", secondary=users_families, back_populates="families")
     babies = so.relationship("Baby", back_populates="family", cascade="all, delete-orphan")
@@ -37,29 +126,68 @@ class Family(db.Model):
 
     @staticmethod
     def generate_family_code(digits = 32):
-        char_set = string.ascii_letters + string.digits
-        code = ''.join(random.SystemRandom().choice(char_set) for _ in range(digits))
-        return code
+        # One batch of OS randomness per code; bytes >= 248 are skipped so every character is equally likely
+        code = []
+        while len(code) < digits:
+            code.extend(FAMILY_CODE_CHARS[byte % 62] for byte in secrets.token_bytes(digits) if byte < 248)
+        return ''.join(code[:digits])
 
     @classmethod
     def create_family(cls, name):
-        family = cls(
-            name = name,
-            code = cls.generate_family_code()
-        )
-        db.session.add(family)
-        db.session.commit()
+        for attempt in range(FAMILY_CODE_RETRIES):
+            family = cls(
+                name = name,
+                code = cls.generate_family_code()
+            )
+            db.session.add(family)
+            try:
+                db.session.commit()
+                break
+            except sa.exc.IntegrityError as e:
+                db.session.rollback()
+                if violated_unique_column(e) != 'code' or attempt == FAMILY_CODE_RETRIES - 1:
+                    raise
+        family_code_cache.delete(family.code)
+        invalidate(('babies', family.id), ('recipes', family.id))
         return family
 
+    @classmethod
+    def bump_data_version(cls, family_id=None, baby_id=None):
+        """Increment a family's data version (by family, or by one of its babies); returns (family id, new version).
+
+        Runs inside the caller's transaction; the row lock it takes keeps versions in commit order.
+        """
+        if family_id is None:
+            family_id = sa.select(Baby.family_id).where(Baby.id == baby_id).scalar_subquery()
+        return db.session.execute(
+            sa.update(cls)
+            .where(cls.id == family_id)
+            .values(data_version=cls.data_version + 1, data_updated_at=datetime.utcnow())
+            .returning(cls.id, cls.data_version)
+            .execution_options(synchronize_session=False)
+        ).one()
+
     @classmethod
     def get_family_from_code(cls, code):
-        return cls.query.filter_by(code=code).first()
+        """Look up a family by its join code, answering malformed and recently seen codes from memory."""
+        code = (code or '').strip()
+        if not FAMILY_CODE_PATTERN.fullmatch(code):
+            return None
+        family_id = family_code_cache.get(code, _UNKNOWN)
+        if family_id is None:
+            return None
+        if family_id is not _UNKNOWN:
+            return db.session.get(cls, family_id)
+        family = cls.query.filter_by(code=code).first()
+        family_code_cache.set(code, family.id if family else None)
+        return family
 
     @staticmethod
     def get_user_families_and_family():
         """Fetches the current user, their families, and the selected family."""
-        user = User.query.filter_by(id=current_user.id).first_or_404()
-        families, family = Family.get_families_for_user(user, request.args.get('family_id', type=int))
+        user = current_user._get_current_object()
+        families = Family.get_cached_families(user.id)
+        family = Family.select_family(families, request.args.get('family_id', type=int))
         return user, families, family
 
     @staticmethod
@@ -68,18 +196,77 @@ class Family(db.Model):
         families = db.session.scalars(
             sa.select(Family).join(users_families).where(users_families.c.user_id == user.id)
         ).all()
-        family = next((f for f in families if f.id == page_family_id), families[0] if families else None)
-        return families, family
+        return families, Family.select_family(families, page_family_id)
+
+    @staticmethod
+    def select_family(families, page_family_id=None):
+        """Pick the family requested by the page, falling back to the first one."""
+        return next((f for f in families if f.id == page_family_id), families[0] if families else None)
+
+    @staticmethod
+    def get_cached_families(user_id):
+        """Read-only rows (id, name, code) for a user's families, cached per request and for a short TTL."""
+        return cached(('families', user_id), lambda: db.session.execute(
+            sa.select(Family.id, Family.name, Family.code)
+            .join(users_families).where(users_families.c.user_id == user_id)
+            .order_by(users_families.c.id)
+        ).all())
+
+    @staticmethod
+    def get_dashboard(families, day=None):
+        """Every family's babies with their latest feeding and totals for `day` (default today), in two queries.
+
+        Returns [(family, [(baby row, daily total row or None)])] in the order of `families`.
+        """
+        family_ids = [family.id for family in families]
+        if not family_ids:
+            return []
+        day = day or date.today()
+
+        # One row per baby; the correlated subquery walks each baby's (baby_id, timestamp) index to its newest feeding
+        latest_id = (
+            sa.select(Feeding.id).where(Feeding.baby_id == Baby.id)
+            .order_by(Feeding.timestamp.desc(), Feeding.id.desc()).limit(1)
+            .correlate(Baby).scalar_subquery()
+        )
+        babies = db.session.execute(
+            sa.select(Baby.id, Baby.family_id, Baby.name, Baby.date_of_birth,
+                      Feeding.timestamp.label('last_fed_at'), Feeding.feeding_type.label('last_feeding_type'),
+                      Feeding.breast_duration, Feeding.bottle_amount, Feeding.solid_amount)
+            .outerjoin(Feeding, Feeding.id == latest_id)
+            .where(Baby.family_id.in_(family_ids))
+            .order_by(Baby.family_id, Baby.id)
+        ).all()
+        totals = {row.baby_id: row for row in db.session.execute(
+            sa.select(FeedingDailyTotal.baby_id, FeedingDailyTotal.feedings, FeedingDailyTotal.breast_minutes,
+                      FeedingDailyTotal.bottle_ml, FeedingDailyTotal.solid_g)
+            .where(FeedingDailyTotal.baby_id.in_([baby.id for baby in babies]), FeedingDailyTotal.day == day)
+        ).all()} if babies else {}
 
+        by_family = {family_id: [] for family_id in family_ids}
+        for baby in babies:
+            by_family[baby.family_id].append((baby, totals.get(baby.id)))
+        return [(family, by_family[family.id]) for family in families]
 
     @staticmethod
     def get_family_data(family, fetch_babies=False, fetch_recipes=False):
-        """Fetch babies and recipes for a given family if needed."""
-        babies = Baby.query.filter_by(family_id=family.id).all() if family and fetch_babies else []
-        recipes = Recipe.query.filter_by(family_id=family.id).all() if family and fetch_recipes else []
+        """Fetch babies and recipes for a given family if needed, as cached read-only rows."""
+        babies = cached(('babies', family.id), lambda: db.session.execute(
+            sa.select(Baby.id, Baby.family_id, Baby.name, Baby.date_of_birth)
+            .where(Baby.family_id == family.id).order_by(Baby.id)
+        ).all()) if family and fetch_babies else []
+        recipes = cached(('recipes', family.id), lambda: db.session.execute(
+            sa.select(Recipe.id, Recipe.family_id, Recipe.recipe_name, Recipe.recipe_ingredients,
+                      Recipe.recipe_instructions, Recipe.amount)
+            .where(Recipe.family_id == family.id).order_by(Recipe.id)
+        ).all()) if family and fetch_recipes else []
         return babies, recipes
 
 
+@functools.lru_cache(maxsize=4096)
+def email_digest(email):
+    """MD5 of a normalised email address, as Gravatar expects; memoised since avatars are drawn on every card."""
+    return md5(email.lower().encode('utf-8')).hexdigest()
 
 # User Table
 class User(UserMixin, db.Model):
@@ -97,14 +284,17 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
 
     def avatar(self, size):
-            digest = md5(self.email.lower().encode('utf-8')).hexdigest()
+            digest = email_digest(self.email)
             return f'https://www.gravatar.com/avatar/{digest}?d=identicon&s={size}'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
 
     def create_user(username, email, password, family, is_admin = False):
         user = User(
@@ -116,6 +306,36 @@ class User(UserMixin, db.Model):
         user.families.append(family)
         db.session.add(user)
         db.session.commit()
+        invalidate(('families', user.id))
+        return user
+
+    def register(username, email, password, family=None, family_name=None, baby_name=None, baby_dob=None):
+        """Create a user, plus a new family and its first baby when no family is given, in one transaction.
+
+        Relies on the unique indexes rather than checking first: raises DuplicateUserError naming
+        the clashing field ('username' or 'email') if another user already has it.
+        """
+        password_hash = hasher.hash(password)
+        for attempt in range(FAMILY_CODE_RETRIES):
+            user = User(username=username, email=email, password_hash=password_hash)
+            user_family = family
+            if user_family is None:
+                user_family = Family(name=family_name, code=Family.generate_family_code())
+                Baby(name=baby_name, date_of_birth=baby_dob, family=user_family)
+            user.families.append(user_family)
+            db.session.add(user)
+            try:
+                db.session.commit()
+                break
+            except sa.exc.IntegrityError as e:
+                db.session.rollback()
+                column = violated_unique_column(e)
+                # A clashing random family code is just bad luck: try again with a new one
+                if column == 'code' and family is None and attempt < FAMILY_CODE_RETRIES - 1:
+                    continue
+                raise DuplicateUserError(column) from e
+        family_code_cache.delete(user_family.code)
+        invalidate(('families', user.id), ('babies', user_family.id), ('recipes', user_family.id))
         return user
 
     def get_user_by_id(user_id):
@@ -132,6 +352,7 @@ class User(UserMixin, db.Model):
         self.families.append(family)
         db.session.add(self)
         db.session.commit()
+        invalidate(('families', self.id))
 
 # Baby Table
 class Baby(db.Model):
@@ -147,6 +368,7 @@ class Baby(db.Model):
     changings = so.relationship("Changing", back_populates="baby", cascade="all, delete-orphan")
     sleepings = so.relationship("Sleeping", back_populates="baby", cascade="all, delete-orphan")
     notes = so.relationship("Note", back_populates="baby", cascade="all, delete-orphan")
+    daily_totals = so.relationship("FeedingDailyTotal", back_populates="baby", cascade="all, delete-orphan")
 
     def create_baby(name, date_of_birth, family_id):
         baby = Baby(
@@ -156,6 +378,7 @@ class Baby(db.Model):
         )
         db.session.add(baby)
         db.session.commit()
+        invalidate(('babies', family_id))
 
 # Recipe Table
 class Recipe(db.Model):
@@ -169,6 +392,8 @@ class Recipe(db.Model):
     amount: so.Mapped[int] = so.mapped_column(sa.Integer)
 
     family = so.relationship("Family", back_populates="recipes")
+    usage = so.relationship("RecipeUsage", back_populates="recipe", uselist=False, cascade="all, delete-orphan")
+    ingredients = so.relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete-orphan")
 
     def create_recipe(family_id, recipe_name, recipe_ingredients, recipe_instructions, amount=None):
         recipe = Recipe(
@@ -179,13 +404,133 @@ class Recipe(db.Model):
             amount=amount,
         )
         db.session.add(recipe)
+        db.session.flush()
+        RecipeIngredient.index_recipe(recipe.id, recipe_ingredients)
+        SearchDocument.index_recipe(recipe)
         db.session.commit()
+        invalidate(('recipes', family_id), ('ingredients', family_id))
+
+    def rank_recipes(recipes, usage):
+        """Order recipes most served first, then most recently served, then by name."""
+        def key(recipe):
+            stats = usage.get(recipe.id)
+            return (-stats.servings if stats else 0,
+                    -(stats.last_served_at - datetime.min).total_seconds() if stats and stats.last_served_at else 0,
+                    recipe.recipe_name.lower())
+        return sorted(recipes, key=key)
+
+# Recipe Usage Table (rollup of the solid feedings served from each recipe)
+class RecipeUsage(db.Model):
+    __tablename__ = "recipe_usage"
+
+    recipe_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("recipes.id"), primary_key=True)
+    servings: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    solid_g: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    last_served_at: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+
+    recipe = so.relationship("Recipe", back_populates="usage")
+
+    def __repr__(self):
+        return f'<RecipeUsage recipe={self.recipe_id} servings={self.servings}>'
+
+    @classmethod
+    def record_feeding(cls, feeding):
+        """Count a newly flushed solid feeding against its recipe (the caller commits)."""
+        if feeding.feeding_type != 'solids' or not feeding.recipe_id:
+            return
+        amount = feeding.solid_amount or 0
+        updated = db.session.execute(
+            sa.update(cls)
+            .where(cls.recipe_id == feeding.recipe_id)
+            .values(servings=cls.servings + 1, solid_g=cls.solid_g + amount,
+                    last_served_at=sa.case((cls.last_served_at >= feeding.timestamp, cls.last_served_at),
+                                           else_=feeding.timestamp))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.add(cls(recipe_id=feeding.recipe_id, servings=1, solid_g=amount, last_served_at=feeding.timestamp))
+
+    @classmethod
+    def rebuild(cls, recipe_ids=None):
+        """Recompute usage from the live and archived feedings in one grouped query, for every recipe or only `recipe_ids`."""
+        branches = [
+            sa.select(model.recipe_id, model.solid_amount, model.timestamp)
+            .where(model.feeding_type == 'solids', model.recipe_id.is_not(None))
+            for model in (Feeding, FeedingArchive)
+        ]
+        if recipe_ids is not None:
+            branches = [branch.where(branch.selected_columns.recipe_id.in_(recipe_ids)) for branch in branches]
+        feedings = sa.union_all(*branches).subquery()
+        query = sa.select(
+            feedings.c.recipe_id,
+            sa.func.count(),
+            sa.func.coalesce(sa.func.sum(sa.func.coalesce(feedings.c.solid_amount, 0)), 0),
+            sa.func.max(feedings.c.timestamp),
+        ).group_by(feedings.c.recipe_id)
+        delete = sa.delete(cls)
+        if recipe_ids is not None:
+            delete = delete.where(cls.recipe_id.in_(recipe_ids))
+
+        db.session.execute(delete.execution_options(synchronize_session=False))
+        db.session.execute(sa.insert(cls).from_select(['recipe_id', 'servings', 'solid_g', 'last_served_at'], query))
+        db.session.commit()
+
+    def get_usage(family_id):
+        """Usage rows for a family's recipes, keyed by recipe id; read from the summary, never from feedings."""
+        return cached(('recipe-usage', family_id), lambda: {row.recipe_id: row for row in db.session.execute(
+            sa.select(RecipeUsage.recipe_id, RecipeUsage.servings, RecipeUsage.solid_g, RecipeUsage.last_served_at)
+            .join(Recipe).where(Recipe.family_id == family_id)
+        ).all()})
+
+# Recipe Ingredient Table (index of the ingredients parsed out of each recipe's free text)
+class RecipeIngredient(db.Model):
+    __tablename__ = "recipe_ingredient_index"
+
+    recipe_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("recipes.id"), primary_key=True)
+    ingredient: so.Mapped[str] = so.mapped_column(sa.String(100), primary_key=True, index=True)
+
+    recipe = so.relationship("Recipe", back_populates="ingredients")
+
+    def parse_ingredients(text):
+        """Split free-text ingredients into normalised names, dropping leading quantities and units."""
+        names = []
+        for part in INGREDIENT_SEPARATORS.split(text or ''):
+            name = INGREDIENT_QUANTITY.sub('', part.strip().lower()).strip(' .')
+            if name and name not in names:
+                names.append(name[:100])
+        return names
+
+    @classmethod
+    def index_recipe(cls, recipe_id, recipe_ingredients):
+        """Replace a recipe's index entries (the caller commits)."""
+        db.session.execute(sa.delete(cls).where(cls.recipe_id == recipe_id))
+        names = cls.parse_ingredients(recipe_ingredients)
+        if names:
+            db.session.execute(sa.insert(cls), [{'recipe_id': recipe_id, 'ingredient': name} for name in names])
+
+    @classmethod
+    def rebuild(cls):
+        """Re-parse every recipe's ingredients."""
+        for recipe_id, recipe_ingredients in db.session.execute(sa.select(Recipe.id, Recipe.recipe_ingredients)).all():
+            cls.index_recipe(recipe_id, recipe_ingredients)
+        db.session.commit()
+
+    def get_family_ingredients(family_id):
+        """Each ingredient used in a family's recipes with the ids of the recipes using it, most common first."""
+        def load():
+            by_ingredient = {}
+            for ingredient, recipe_id in db.session.execute(
+                sa.select(RecipeIngredient.ingredient, RecipeIngredient.recipe_id)
+                .join(Recipe).where(Recipe.family_id == family_id)
+            ).all():
+                by_ingredient.setdefault(ingredient, []).append(recipe_id)
+            return sorted(by_ingredient.items(), key=lambda item: (-len(item[1]), item[0]))
+        return cached(('ingredients', family_id), load)
 
 # Feeding Table
-class Feeding(db.Model):
-    __tablename__ = "feedings"
+class FeedingColumns(ClientKeyed, Versioned):
+    """Columns shared by live feedings and archived ones, which keep their original ids."""
 
-    id: so.Mapped[int] = so.mapped_column(primary_key=True)
     baby_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("babies.id"), index=True)
     user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("users.id"), index=True)
     timestamp: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=sa.func.current_timestamp())
@@ -195,11 +540,22 @@ class Feeding(db.Model):
     solid_amount: so.Mapped[Optional[int]] = so.mapped_column(sa.Integer)
     recipe_id: so.Mapped[Optional[int]] = so.mapped_column(sa.ForeignKey("recipes.id"), nullable=True)
 
+FEEDING_COLUMNS = ['id', 'baby_id', 'user_id', 'timestamp', 'feeding_type', 'breast_duration', 'bottle_amount',
+                   'solid_amount', 'recipe_id', 'version', 'client_id']
+
+class Feeding(FeedingColumns, db.Model):
+    __tablename__ = "feedings"
+    # Archived ids must never be handed out again, or moving the reused id to the archive would collide
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True)
+
     recipe = db.relationship('Recipe', backref='feedings')
     baby = so.relationship("Baby", back_populates="feedings")
     user = so.relationship('User', backref='feedings')
 
     def create_feeding(baby_id, user_id, timestamp, feeding_type, breast_duration=None, bottle_amount=None, solid_amount=None, recipe_id=None):
+        family_id, version = Family.bump_data_version(baby_id=baby_id)
         feeding = Feeding(
             baby_id=baby_id,
             user_id=user_id,
@@ -209,22 +565,232 @@ class Feeding(db.Model):
             bottle_amount=bottle_amount,
             solid_amount=solid_amount,
             recipe_id=recipe_id,
+            version=version,
         )
         db.session.add(feeding)
+        db.session.flush()
+        FeedingDailyTotal.record_feeding(feeding)
+        RecipeUsage.record_feeding(feeding)
+        event = feeding.to_dict()
         db.session.commit()
+        invalidate(('prediction', baby_id), ('recipe-usage', family_id))
+        events.publish(family_id, 'feeding', event)
         return feeding
 
-    def get_feedings(babies):
-        feedings = sorted(
-            (feeding for baby in babies for feeding in baby.feedings),
-            key=lambda f: f.timestamp,
-            reverse=True
+    def feed_options(strategy='joined', model=None):
+        """Loader options that fetch the user, baby and recipe a feeding card displays."""
+        model = model or Feeding
+        loader = {'joined': so.joinedload, 'selectin': so.selectinload}[strategy]
+        return [loader(model.user), loader(model.baby), loader(model.recipe)]
+
+    def _before(query, before, model):
+        """Keep feedings older than the (timestamp, id) keyset position `before`."""
+        if before is None:
+            return query
+        timestamp, feeding_id = before
+        return query.where(sa.or_(
+            model.timestamp < timestamp,
+            sa.and_(model.timestamp == timestamp, model.id < feeding_id),
+        ))
+
+    def _timeline_query(query, babies, before=None, limit=None, model=None):
+        """Apply the baby filter, keyset cursor, newest-first ordering and limit to a feed query.
+
+        With a limit, each baby's newest `limit` ids are picked by walking its own (baby_id, timestamp, id)
+        index and only those are merged and sorted, so a page costs the same however long the history.
+        """
+        model = model or Feeding
+        if babies is not None and limit is not None:
+            branches = []
+            for baby in babies:
+                branch = Feeding._before(sa.select(model.id).where(model.baby_id == baby.id), before, model)
+                branch = branch.order_by(model.timestamp.desc(), model.id.desc()).limit(limit).subquery()
+                branches.append(sa.select(branch.c.id))
+            query = query.where(model.id.in_(sa.union_all(*branches)))
+        else:
+            if babies is not None:
+                query = query.where(model.baby_id.in_([baby.id for baby in babies]))
+            query = Feeding._before(query, before, model)
+        query = query.order_by(model.timestamp.desc(), model.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def get_feedings(babies, before=None, limit=None, strategy='joined'):
+        """Fetch feedings for the given babies, newest first, ordered and limited in SQL.
+
+        The archive is only read when the live table cannot fill the page with feedings newer
+        than the archive horizon, i.e. when someone pages back that far.
+        """
+        if not babies:
+            return []
+        feedings = []
+        for model in (Feeding, FeedingArchive):
+            query = sa.select(model).options(*Feeding.feed_options(strategy, model))
+            feedings += db.session.scalars(Feeding._timeline_query(query, babies, before, limit, model)).unique().all()
+            if limit is not None and len(feedings) >= limit and feedings[limit - 1].timestamp >= FeedingArchive.horizon():
+                break
+        if model is FeedingArchive:
+            feedings.sort(key=lambda feeding: (feeding.timestamp, feeding.id), reverse=True)
+        return feedings[:limit] if limit is not None else feedings
+
+    def get_feed_rows(babies=None, before=None, limit=None):
+        """Fetch a read-only projection of feedings (no ORM objects) in a single query.
+
+        Passing babies=None returns feedings for every baby.
+        """
+        query = (
+            sa.select(
+                Feeding.id, Feeding.baby_id, Feeding.user_id, Feeding.timestamp, Feeding.feeding_type,
+                Feeding.breast_duration, Feeding.bottle_amount, Feeding.solid_amount, Feeding.recipe_id,
+                Baby.name.label('baby_name'), User.username, Recipe.recipe_name,
+            )
+            .join(Baby, Feeding.baby_id == Baby.id)
+            .join(User, Feeding.user_id == User.id)
+            .outerjoin(Recipe, Feeding.recipe_id == Recipe.id)
         )
-        return feedings
+        return db.session.execute(Feeding._timeline_query(query, babies, before, limit)).all()
+
+    def get_feedings_page(babies, cursor=None, per_page=20):
+        """Fetch one page of the feeding timeline and the cursor for the next (older) page."""
+        feedings = Feeding.get_feedings(babies, before=decode_cursor(cursor), limit=per_page + 1)
+        next_cursor = None
+        if len(feedings) > per_page:
+            feedings = feedings[:per_page]
+            next_cursor = encode_cursor(feedings[-1].timestamp, feedings[-1].id)
+        return feedings, next_cursor
+
+# Timeline queries filter on baby and walk backwards in (timestamp, id) order
+sa.Index('ix_feedings_baby_id_timestamp', Feeding.baby_id, Feeding.timestamp.desc(), Feeding.id.desc())
+
+# Feeding Archive Table (feedings older than the retention horizon, moved out of the hot table)
+class FeedingArchive(FeedingColumns, db.Model):
+    __tablename__ = "feedings_archive"
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True, autoincrement=False)
+
+    recipe = so.relationship('Recipe')
+    baby = so.relationship('Baby')
+    user = so.relationship('User')
+
+    def horizon():
+        """Feedings older than this may have been archived; everything newer is still in `feedings`."""
+        return datetime.utcnow() - timedelta(days=current_app.config['FEEDING_ARCHIVE_AFTER_DAYS'])
+
+    @classmethod
+    def archive_feedings(cls, cutoff=None, batch_size=1000):
+        """Move feedings older than `cutoff` (default: the horizon) into the archive, one transaction per batch.
+
+        Feedings a note points at stay in the live table. The daily totals are left as they are,
+        and rebuild() reads both tables. Returns how many feedings were moved.
+        """
+        cutoff = cutoff or cls.horizon()
+        source = sa.select(*[Feeding.__table__.c[name] for name in FEEDING_COLUMNS])
+        moved = 0
+        while True:
+            ids = db.session.scalars(
+                sa.select(Feeding.id)
+                .where(Feeding.timestamp < cutoff, ~sa.exists().where(Note.feeding_id == Feeding.id))
+                .order_by(Feeding.id).limit(batch_size)
+            ).all()
+            if not ids:
+                return moved
+            db.session.execute(sa.insert(cls).from_select(FEEDING_COLUMNS, source.where(Feeding.id.in_(ids))))
+            db.session.execute(sa.delete(Feeding).where(Feeding.id.in_(ids)).execution_options(synchronize_session=False))
+            db.session.commit()
+            moved += len(ids)
+
+sa.Index('ix_feedings_archive_baby_id_timestamp', FeedingArchive.baby_id, FeedingArchive.timestamp.desc(), FeedingArchive.id.desc())
+
+# Feeding Daily Totals Table (rollup of feedings per baby per day)
+class FeedingDailyTotal(db.Model):
+    __tablename__ = "feeding_daily_totals"
+
+    baby_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("babies.id"), primary_key=True)
+    day: so.Mapped[date] = so.mapped_column(sa.Date, primary_key=True)
+    feedings: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    breast_minutes: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    bottle_ml: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    solid_g: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+
+    baby = so.relationship("Baby", back_populates="daily_totals")
+
+    # Which total each feeding type contributes to, and the Feeding column it is read from
+    TOTALS = {
+        'breast': ('breast_minutes', 'breast_duration'),
+        'bottle': ('bottle_ml', 'bottle_amount'),
+        'solids': ('solid_g', 'solid_amount'),
+    }
+
+    def __repr__(self):
+        return f'<FeedingDailyTotal baby={self.baby_id} day={self.day}>'
+
+    @classmethod
+    def record_feeding(cls, feeding):
+        """Add a newly flushed feeding to its baby's total for the day (the caller commits)."""
+        day = feeding.timestamp.date()
+        amounts = {total: 0 for total, _ in cls.TOTALS.values()}
+        if feeding.feeding_type in cls.TOTALS:
+            total, source = cls.TOTALS[feeding.feeding_type]
+            amounts[total] = getattr(feeding, source) or 0
+
+        updated = db.session.execute(
+            sa.update(cls)
+            .where(cls.baby_id == feeding.baby_id, cls.day == day)
+            .values(feedings=cls.feedings + 1,
+                    **{total: getattr(cls, total) + amount for total, amount in amounts.items()})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.add(cls(baby_id=feeding.baby_id, day=day, feedings=1, **amounts))
+
+    @classmethod
+    def rebuild(cls, baby_ids=None):
+        """Recompute the totals from the live and archived feedings, for every baby or only `baby_ids`."""
+        branches = [sa.select(*[model.__table__.c[name] for name in FEEDING_COLUMNS]) for model in (Feeding, FeedingArchive)]
+        if baby_ids is not None:
+            branches = [branch.where(branch.selected_columns.baby_id.in_(baby_ids)) for branch in branches]
+        feedings = sa.union_all(*branches).subquery()
+        day = sa.func.date(feedings.c.timestamp)
+        sums = [
+            sa.func.coalesce(sa.func.sum(sa.case(
+                (feedings.c.feeding_type == feeding_type, sa.func.coalesce(feedings.c[source], 0)),
+                else_=0,
+            )), 0)
+            for feeding_type, (_, source) in cls.TOTALS.items()
+        ]
+        query = sa.select(feedings.c.baby_id, day, sa.func.count(feedings.c.id), *sums).group_by(feedings.c.baby_id, day)
+        delete = sa.delete(cls)
+        if baby_ids is not None:
+            delete = delete.where(cls.baby_id.in_(baby_ids))
+
+        db.session.execute(delete.execution_options(synchronize_session=False))
+        columns = ['baby_id', 'day', 'feedings'] + [total for total, _ in cls.TOTALS.values()]
+        db.session.execute(sa.insert(cls).from_select(columns, query))
+        db.session.commit()
+
+    @classmethod
+    def get_series(cls, babies, days):
+        """Zero-filled daily totals for each baby over the last `days` days, today included."""
+        start = date.today() - timedelta(days=days - 1)
+        labels = [start + timedelta(days=offset) for offset in range(days)]
+        rows = db.session.scalars(
+            sa.select(cls).where(cls.baby_id.in_([baby.id for baby in babies]), cls.day >= start)
+        ).all() if babies else []
+        by_key = {(row.baby_id, row.day): row for row in rows}
+
+        series = []
+        for baby in babies:
+            entry = {'baby_id': baby.id, 'name': baby.name}
+            for field in ['feedings'] + [total for total, _ in cls.TOTALS.values()]:
+                entry[field] = [getattr(by_key[(baby.id, day)], field) if (baby.id, day) in by_key else 0
+                                for day in labels]
+            series.append(entry)
+        return {'labels': [day.isoformat() for day in labels], 'babies': series}
 
 
 # Changing Table
-class Changing(db.Model):
+class Changing(ClientKeyed, Versioned, db.Model):
     __tablename__ = "changings"
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
@@ -235,8 +801,26 @@ class Changing(db.Model):
 
     baby = so.relationship("Baby", back_populates="changings")
 
+    def create_changing(baby_id, timestamp, wet_nappy, poop_amount=None):
+        family_id, version = Family.bump_data_version(baby_id=baby_id)
+        changing = Changing(
+            baby_id=baby_id,
+            timestamp=timestamp,
+            wet_nappy=wet_nappy,
+            poop_amount=poop_amount,
+            version=version,
+        )
+        db.session.add(changing)
+        db.session.flush()
+        event = changing.to_dict()
+        db.session.commit()
+        events.publish(family_id, 'changing', event)
+        return changing
+
+sa.Index('ix_changings_baby_id_timestamp', Changing.baby_id, Changing.timestamp.desc(), Changing.id.desc())
+
 # Sleeping Table
-class Sleeping(db.Model):
+class Sleeping(ClientKeyed, Versioned, db.Model):
     __tablename__ = "sleepings"
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
@@ -246,8 +830,25 @@ class Sleeping(db.Model):
 
     baby = so.relationship("Baby", back_populates="sleepings")
 
+    def create_sleeping(baby_id, start_timestamp, end_timestamp=None):
+        family_id, version = Family.bump_data_version(baby_id=baby_id)
+        sleeping = Sleeping(
+            baby_id=baby_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            version=version,
+        )
+        db.session.add(sleeping)
+        db.session.flush()
+        event = sleeping.to_dict()
+        db.session.commit()
+        events.publish(family_id, 'sleeping', event)
+        return sleeping
+
+sa.Index('ix_sleepings_baby_id_start_timestamp', Sleeping.baby_id, Sleeping.start_timestamp.desc(), Sleeping.id.desc())
+
 # Notes Table
-class Note(db.Model):
+class Note(Versioned, db.Model):
     __tablename__ = "notes"
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
@@ -260,6 +861,257 @@ class Note(db.Model):
 
     baby = so.relationship("Baby", back_populates="notes")
 
+    def create_note(baby_id, timestamp, extra, feeding_id=None, changing_id=None, sleeping_id=None):
+        family_id, version = Family.bump_data_version(baby_id=baby_id)
+        note = Note(
+            baby_id=baby_id,
+            timestamp=timestamp,
+            extra=extra,
+            feeding_id=feeding_id,
+            changing_id=changing_id,
+            sleeping_id=sleeping_id,
+            version=version,
+        )
+        db.session.add(note)
+        db.session.flush()
+        SearchDocument.index_note(note, family_id)
+        event = note.to_dict()
+        db.session.commit()
+        events.publish(family_id, 'note', event)
+        return note
+
+sa.Index('ix_notes_baby_id_timestamp', Note.baby_id, Note.timestamp.desc(), Note.id.desc())
+
+
+# Search index over recipes and notes
+SEARCH_TOKEN = re.compile(r'\w+')
+SEARCH_TITLE_WEIGHT = 5  # a word in a recipe name counts this many times as one in its text
+
+def search_tokens(text):
+    """Lower-cased words of `text`, with a trailing plural 's' dropped so 'carrots' finds 'carrot'."""
+    tokens = []
+    for token in SEARCH_TOKEN.findall((text or '').lower()):
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token[:50])
+    return tokens
+
+class SearchDocument(db.Model):
+    """One searchable recipe or note, copied into a single family-scoped table the search backends index."""
+    __tablename__ = "search_documents"
+    __table_args__ = (sa.UniqueConstraint('kind', 'ref_id'),)
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True)
+    family_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("families.id"), index=True)
+    kind: so.Mapped[str] = so.mapped_column(sa.String(20))  # 'recipe' or 'note'
+    ref_id: so.Mapped[int] = so.mapped_column(sa.Integer)
+    baby_id: so.Mapped[Optional[int]] = so.mapped_column(sa.ForeignKey("babies.id"))
+    title: so.Mapped[Optional[str]] = so.mapped_column(sa.String(100))
+    body: so.Mapped[Optional[str]] = so.mapped_column(sa.Text)
+    timestamp: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+
+    def backend():
+        """'fts5', 'postgres' or 'python': how this database's search index is kept and queried."""
+        backend = current_app.extensions.get('search_backend')
+        if backend is None:
+            dialect = db.engine.dialect.name
+            if current_app.config['SEARCH_BACKEND'] == 'python':
+                backend = 'python'
+            elif dialect == 'postgresql':
+                backend = 'postgres'
+            elif dialect == 'sqlite' and sa.inspect(db.engine).has_table(SEARCH_FTS_TABLE):
+                backend = 'fts5'
+            else:
+                backend = 'python'
+            current_app.extensions['search_backend'] = backend
+        return backend
+
+    @classmethod
+    def index(cls, kind, ref_id, family_id, title, body, baby_id=None, timestamp=None):
+        """Replace the search entry for one recipe or note (the caller commits).
+
+        The FTS5 and Postgres indexes follow the table by themselves; the pure-Python
+        fallback keeps its postings in SearchTerm.
+        """
+        existing = db.session.scalar(sa.select(cls.id).where(cls.kind == kind, cls.ref_id == ref_id))
+        if existing:
+            db.session.execute(sa.delete(SearchTerm).where(SearchTerm.document_id == existing))
+            db.session.execute(sa.delete(cls).where(cls.id == existing))
+        document_id = db.session.execute(sa.insert(cls).values(
+            family_id=family_id, kind=kind, ref_id=ref_id, baby_id=baby_id,
+            title=title, body=body, timestamp=timestamp,
+        )).inserted_primary_key[0]
+        if cls.backend() == 'python':
+            SearchTerm.index_document(document_id, title, body)
+
+    @classmethod
+    def index_recipe(cls, recipe):
+        text = '\n'.join(part for part in (recipe.recipe_ingredients, recipe.recipe_instructions) if part)
+        cls.index('recipe', recipe.id, recipe.family_id, recipe.recipe_name, text)
+
+    @classmethod
+    def index_note(cls, note, family_id):
+        cls.index('note', note.id, family_id, None, note.extra, baby_id=note.baby_id, timestamp=note.timestamp)
+
+    @classmethod
+    def rebuild(cls):
+        """Re-index every recipe and note, e.g. after switching backend or restoring data."""
+        db.session.execute(sa.delete(SearchTerm))
+        db.session.execute(sa.delete(cls))
+        for recipe in db.session.scalars(sa.select(Recipe)):
+            cls.index_recipe(recipe)
+        for note, family_id in db.session.execute(sa.select(Note, Baby.family_id).join(Baby)):
+            cls.index_note(note, family_id)
+        db.session.commit()
+
+class SearchTerm(db.Model):
+    """Postings of the pure-Python search fallback: how often each word occurs in each document."""
+    __tablename__ = "search_terms"
+
+    term: so.Mapped[str] = so.mapped_column(sa.String(50), primary_key=True)
+    document_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("search_documents.id"), primary_key=True, index=True)
+    weight: so.Mapped[int] = so.mapped_column(sa.Integer)
+
+    def index_document(document_id, title, body):
+        weights = {}
+        for token in search_tokens(title):
+            weights[token] = weights.get(token, 0) + SEARCH_TITLE_WEIGHT
+        for token in search_tokens(body):
+            weights[token] = weights.get(token, 0) + 1
+        if weights:
+            db.session.execute(sa.insert(SearchTerm), [
+                {'term': term, 'document_id': document_id, 'weight': weight} for term, weight in weights.items()
+            ])
+
+# SQLite keeps an external-content FTS5 table in step with search_documents through triggers, and
+# Postgres indexes the weighted tsvector expression that searches match against
+SEARCH_FTS_TABLE = 'search_documents_fts'
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE {SEARCH_FTS_TABLE} USING fts5(title, body, content='search_documents', "
+    "content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    f"CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    f"CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+POSTGRES_SEARCH_VECTOR = ("(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                          "to_tsvector('english', coalesce(body, '')))")
+
+@sa.event.listens_for(SearchDocument.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        # Without FTS5 compiled in, search falls back to the SearchTerm postings
+        if connection.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar():
+            for statement in SQLITE_SEARCH_DDL:
+                connection.exec_driver_sql(statement)
+    elif connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(
+            f'CREATE INDEX ix_search_documents_vector ON search_documents USING gin ({POSTGRES_SEARCH_VECTOR})')
+
+@sa.event.listens_for(SearchDocument.__table__, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}')
+
+
+# Detail columns of the merged event timeline; each table fills in its own and leaves the rest NULL
+EVENT_COLUMN_TYPES = {
+    'feeding_type': sa.String(20), 'amount': sa.Integer(), 'wet_nappy': sa.Boolean(),
+    'poop_amount': sa.Integer(), 'end_timestamp': sa.DateTime(), 'extra': sa.Text(),
+}
+
+def _event_branch(kind, model, time_column, columns, baby_id, before, limit):
+    """One baby's slice of one table's events, filtered and limited so it walks the (baby_id, time, id) index."""
+    # Only the NULL fillers are cast (so every branch agrees on types); casting real columns would
+    # coerce SQLite's text timestamps to numbers
+    values = {name: columns.get(name, sa.cast(sa.null(), column_type)) for name, column_type in EVENT_COLUMN_TYPES.items()}
+    query = sa.select(
+        sa.literal(kind, sa.String(20)).label('kind'),
+        model.id.label('id'),
+        model.baby_id.label('baby_id'),
+        time_column.label('timestamp'),
+        *(value.label(name) for name, value in values.items()),
+    ).where(model.baby_id == baby_id)
+    if before is not None:
+        timestamp, before_kind, before_id = before
+        # Rows are ordered by (timestamp, kind, id) descending; kind is constant within a branch
+        if kind < before_kind:
+            query = query.where(time_column <= timestamp)
+        elif kind > before_kind:
+            query = query.where(time_column < timestamp)
+        else:
+            query = query.where(sa.or_(time_column < timestamp, sa.and_(time_column == timestamp, model.id < before_id)))
+    return query.order_by(time_column.desc(), model.id.desc()).limit(limit).subquery()
+
+def get_baby_events(babies, before=None, limit=50):
+    """Merged, newest-first timeline of (live and archived) feedings, changings, sleepings and notes in one query.
+
+    `before` is a (timestamp, kind, id) position to continue from.
+    """
+    if not babies:
+        return []
+    # Archived feedings are a second 'feeding' branch; they keep their ids, so cursors work across both
+    sources = [
+        ('feeding', model, model.timestamp, {
+            'feeding_type': model.feeding_type,
+            'amount': sa.case(
+                (model.feeding_type == 'breast', model.breast_duration),
+                (model.feeding_type == 'bottle', model.bottle_amount),
+                (model.feeding_type == 'solids', model.solid_amount),
+            ),
+        })
+        for model in (Feeding, FeedingArchive)
+    ] + [
+        ('changing', Changing, Changing.timestamp, {'wet_nappy': Changing.wet_nappy, 'poop_amount': Changing.poop_amount}),
+        ('sleeping', Sleeping, Sleeping.start_timestamp, {'end_timestamp': Sleeping.end_timestamp}),
+        ('note', Note, Note.timestamp, {'extra': Note.extra}),
+    ]
+    # One branch per table per baby, so no branch has to sort more than `limit` rows
+    branches = [_event_branch(kind, model, time_column, columns, baby.id, before, limit)
+                for kind, model, time_column, columns in sources for baby in babies]
+    merged = sa.union_all(*(sa.select(branch) for branch in branches)).subquery()
+    query = sa.select(merged).order_by(merged.c.timestamp.desc(), merged.c.kind.desc(), merged.c.id.desc()).limit(limit)
+    return db.session.execute(query).all()
+
+def get_baby_events_page(babies, cursor=None, per_page=20):
+    """One page of the merged baby event timeline and the cursor for the next (older) page."""
+    rows = get_baby_events(babies, before=decode_event_cursor(cursor), limit=per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_event_cursor(rows[-1].timestamp, rows[-1].kind, rows[-1].id)
+    return rows, next_cursor
+
+# Jobs Table (the background job queue; `flask worker` runs them)
+class Job(db.Model):
+    __tablename__ = "jobs"
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True)
+    name: so.Mapped[str] = so.mapped_column(sa.String(64))
+    args: so.Mapped[str] = so.mapped_column(sa.Text, default='{}')  # JSON keyword arguments
+    status: so.Mapped[str] = so.mapped_column(sa.String(20), default='queued')  # queued, running, done or failed
+    attempts: so.Mapped[int] = so.mapped_column(sa.Integer, default=0)
+    max_attempts: so.Mapped[int] = so.mapped_column(sa.Integer, default=5)
+    run_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow)
+    created_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow)
+    started_at: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+    finished_at: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+    locked_by: so.Mapped[Optional[str]] = so.mapped_column(sa.String(64))
+    locked_until: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+    # Set while a scheduled job is pending so each schedule has at most one queued run
+    unique_key: so.Mapped[Optional[str]] = so.mapped_column(sa.String(64), unique=True)
+    result: so.Mapped[Optional[str]] = so.mapped_column(sa.Text)
+    error: so.Mapped[Optional[str]] = so.mapped_column(sa.Text)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+# Workers look for due jobs by status and time
+sa.Index('ix_jobs_status_run_at', Job.status, Job.run_at)
+
 @login.user_loader
 def load_user(id):
     return db.session.get(User, int(id))
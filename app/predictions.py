@@ -0,0 +1,113 @@
+from app import db
+from app.cache import cached_many
+from app.models import Feeding
+from array import array
+from datetime import datetime, timedelta
+from itertools import groupby
+import operator
+import statistics
+import sqlalchemy as sa
+
+HISTORY_DAYS = 14        # how far back the analysis looks
+ROLLING_WINDOW = 6       # intervals in the rolling average used for the prediction
+SESSION_GAP = 30 * 60    # feeds closer together than this (seconds) are one session, e.g. switching sides
+MIN_SPREAD = 15 * 60     # narrowest predicted window either side of the expected time
+MIN_SESSIONS = 3
+
+EPOCH = datetime(1970, 1, 1)
+# Per-day totals and the amount column each feeding type adds to
+DAILY_TOTALS = {'breast': 'breast_minutes', 'bottle': 'bottle_ml', 'solids': 'solid_g'}
+
+
+def load_columns(baby_ids, since):
+    """Each baby's feedings since `since`, oldest first, as parallel column arrays instead of ORM objects.
+
+    Loads every baby in one query. Returns {baby_id: (times in seconds since the epoch, feeding types,
+    amounts in each type's unit)}, leaving out babies with no feedings.
+    """
+    amount = sa.case(
+        (Feeding.feeding_type == 'breast', Feeding.breast_duration),
+        (Feeding.feeding_type == 'bottle', Feeding.bottle_amount),
+        (Feeding.feeding_type == 'solids', Feeding.solid_amount),
+    )
+    rows = db.session.execute(
+        sa.select(Feeding.baby_id, Feeding.timestamp, Feeding.feeding_type, sa.func.coalesce(amount, 0))
+        .where(Feeding.baby_id.in_(baby_ids), Feeding.timestamp >= since)
+        .order_by(Feeding.baby_id, Feeding.timestamp)
+    ).all()
+    columns = {}
+    for baby_id, baby_rows in groupby(rows, key=operator.itemgetter(0)):
+        _, timestamps, types, amounts = zip(*baby_rows)
+        columns[baby_id] = (array('d', ((ts - EPOCH).total_seconds() for ts in timestamps)), list(types),
+                            array('d', amounts))
+    return columns
+
+def differences(values):
+    """Element-wise values[i + 1] - values[i]."""
+    return array('d', map(operator.sub, values[1:], values[:-1]))
+
+def session_starts(times):
+    """Start time of each feeding session, merging feeds less than SESSION_GAP apart."""
+    if not times:
+        return array('d')
+    return array('d', [times[0]] + [time for time, gap in zip(times[1:], differences(times)) if gap >= SESSION_GAP])
+
+def daily_totals(times, types, amounts):
+    """Feed count and volume per calendar day, oldest day first."""
+    days = [int(time // 86400) for time in times]
+    totals = []
+    for day, indexes in groupby(range(len(days)), key=days.__getitem__):
+        entry = {'day': (EPOCH + timedelta(days=day)).date().isoformat(), 'feedings': 0}
+        entry.update({total: 0 for total in DAILY_TOTALS.values()})
+        for i in indexes:
+            entry['feedings'] += 1
+            if types[i] in DAILY_TOTALS:
+                entry[DAILY_TOTALS[types[i]]] += int(amounts[i])
+        totals.append(entry)
+    return totals
+
+def _isoformat(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).isoformat(timespec='minutes')
+
+def predict_next_feed(baby_id, times, types, amounts):
+    """Analyse a baby's recent feedings (as from load_columns) and predict when the next one is due.
+
+    Returns None when there are too few recent feeding sessions to go on.
+    """
+    starts = session_starts(times)
+    if len(starts) < MIN_SESSIONS:
+        return None
+
+    intervals = differences(starts)
+    # Only the latest value of the rolling average is needed: the mean of the last window
+    recent = intervals[-ROLLING_WINDOW:]
+    expected_interval = statistics.fmean(recent)
+    spread = max(statistics.pstdev(recent), MIN_SPREAD)
+    expected = starts[-1] + expected_interval
+    return {
+        'baby_id': baby_id,
+        'last_feeding': _isoformat(times[-1]),
+        'sessions': len(starts),
+        'average_interval_minutes': round(statistics.fmean(intervals) / 60),
+        'rolling_interval_minutes': round(expected_interval / 60),
+        'next_feed': {
+            'earliest': _isoformat(expected - spread),
+            'expected': _isoformat(expected),
+            'latest': _isoformat(expected + spread),
+        },
+        'daily': daily_totals(times, types, amounts),
+    }
+
+def predict_next_feeds(baby_ids, now=None):
+    """{baby_id: prediction or None} for several babies, from one query."""
+    now = now or datetime.now()
+    columns = load_columns(baby_ids, now - timedelta(days=HISTORY_DAYS))
+    return {baby_id: predict_next_feed(baby_id, *columns[baby_id]) if baby_id in columns else None
+            for baby_id in baby_ids}
+
+def get_predictions(baby_ids):
+    """Cached predictions for several babies, in order; Feeding.create_feeding invalidates each one."""
+    def load(keys):
+        predictions = predict_next_feeds([baby_id for _, baby_id in keys])
+        return {('prediction', baby_id): prediction for baby_id, prediction in predictions.items()}
+    return cached_many([('prediction', baby_id) for baby_id in baby_ids], load)
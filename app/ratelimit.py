@@ -0,0 +1,42 @@
+from collections import OrderedDict, deque
+import threading
+import time
+
+
+class SlidingWindowLimiter:
+    """Allows at most `limit` hits per key in any `window` seconds.
+
+    Tracks at most `maxsize` keys, forgetting the least recently seen, so memory stays bounded.
+    """
+
+    def __init__(self, limit, window, maxsize=10000):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._hits = OrderedDict()
+
+    def hit(self, *keys):
+        """Record a hit against every key; returns False (recording nothing) if any key is over its limit."""
+        now = time.monotonic()
+        with self._lock:
+            windows = []
+            for key in keys:
+                hits = self._hits.get(key)
+                if hits is None:
+                    hits = self._hits[key] = deque()
+                self._hits.move_to_end(key)
+                while hits and hits[0] <= now - self.window:
+                    hits.popleft()
+                windows.append(hits)
+            allowed = all(len(hits) < self.limit for hits in windows)
+            if allowed:
+                for hits in windows:
+                    hits.append(now)
+            while len(self._hits) > self.maxsize:
+                self._hits.popitem(last=False)
+            return allowed
+
+    def reset(self):
+        with self._lock:
+            self._hits.clear()
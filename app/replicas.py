@@ -0,0 +1,58 @@
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+import random
+import sqlalchemy as sa
+import time
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the request's read replica, and everything else to the primary.
+
+    Once the session has written, it reads from the primary too until the transaction ends.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing or isinstance(clause, sa.sql.dml.UpdateBase):
+            self.info['wrote'] = True
+        elif (isinstance(clause, sa.Select) and clause._for_update_arg is None and not self.info.get('wrote')
+              and has_request_context() and g.get('db_replica')):
+            return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@sa.event.listens_for(RoutingSession, 'after_commit')
+def stick_to_primary(db_session):
+    """After committing a write, keep this request and the client's next few on the primary so they see it."""
+    if not db_session.info.pop('wrote', False) or not has_request_context() or not replica_keys(current_app):
+        return
+    g.db_replica = None
+    session['primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+@sa.event.listens_for(RoutingSession, 'after_rollback')
+def forget_writes(db_session):
+    db_session.info.pop('wrote', None)
+
+
+def replica_keys(app):
+    return [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith('replica')]
+
+def init_app(app):
+    """Route read-only requests to a randomly chosen replica bind unless the client recently wrote."""
+    keys = replica_keys(app)
+    if not keys:
+        return
+
+    @app.before_request
+    def choose_replica():
+        if request.method in READ_METHODS and session.get('primary_until', 0) < time.time():
+            g.db_replica = random.choice(keys)
+
+def copy_sqlite(source_engine, target_engine):
+    """Replace the target SQLite database with a consistent snapshot of the source, for local replica testing."""
+    source, target = source_engine.raw_connection(), target_engine.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
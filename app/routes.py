@@ -1,101 +1,178 @@
-from app import app, db
-from app.forms import LoginForm, RegistrationForm, EditFeedingForm, AddBabyForm, AddFamilyForm, AddRecipeForm
-from app.models import User, Family, Baby, Feeding, Changing, Sleeping, Note, Recipe, users_families
-from collections import defaultdict
-from datetime import datetime, timedelta
-from flask import render_template, flash, redirect, url_for, request
+from app import db, events
+from app.forms import LoginForm, RegistrationForm, EditFeedingForm, AddBabyForm, AddFamilyForm, AddRecipeForm, \
+    AddChangingForm, AddSleepingForm, AddNoteForm
+from app.hashing import HashingBusy
+from app.models import DuplicateUserError, User, Family, Baby, Feeding, FeedingDailyTotal, Changing, Sleeping, Note, Recipe, RecipeUsage, \
+    RecipeIngredient, users_families, get_baby_events_page
+from app.predictions import get_predictions
+from app.ratelimit import SlidingWindowLimiter
+from app.search import search as search_documents, snippet
+from flask import Blueprint, current_app, render_template, flash, redirect, url_for, request, jsonify, abort, Response
 from flask_login import current_user, login_user, logout_user, login_required
+import json
+import queue
 import sqlalchemy as sa
 from urllib.parse import urlsplit
 
-@app.route('/')
-@login_required
-def index():
-    # # Get the last 7 days
-    # today = datetime.now().date()
-    # start_date = today - timedelta(days=6)  # Show last 7 days including today
+bp = Blueprint('main', __name__)
 
-    # # Query feedings for the last week
-    # feedings = Feeding.query.join(Baby).filter(
-    # Baby.family_id == current_user.family_id,
-    # Feeding.timestamp >= start_date).all()
+family_code_limiter = None
 
-    # # Count feedings per day
-    # feeding_counts = defaultdict(int)
-    # for feeding in feedings:
-    #     day = feeding.timestamp.date()
-    #     feeding_counts[day] += 1
+@bp.record_once
+def init_family_code_limiter(state):
+    global family_code_limiter
+    family_code_limiter = SlidingWindowLimiter(state.app.config['FAMILY_CODE_ATTEMPTS'],
+                                               state.app.config['FAMILY_CODE_WINDOW_SECONDS'])
 
-    # # Ensure all days are present (0 if no feedings)
-    # labels = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)]
-    # data = [feeding_counts[datetime.strptime(day, '%Y-%m-%d').date()] for day in labels]
+def family_code_attempt_allowed():
+    """Rate limit family code lookups per client IP and, when signed in, per user."""
+    keys = [f'ip:{request.remote_addr}']
+    if current_user.is_authenticated:
+        keys.append(f'user:{current_user.id}')
+    return family_code_limiter.hit(*keys)
 
-    return render_template('index.html', title="Home")#, labels=labels, data=data)
+@bp.route('/')
+@login_required
+def index():
+    _, families, family = Family.get_user_families_and_family()
+    return render_template('index.html', title="Home", families=families, family=family)
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Every family the user belongs to on one page."""
+    families = Family.get_cached_families(current_user.id)
+    return render_template('dashboard.html', title='Dashboard', dashboard=Family.get_dashboard(families))
+
+@bp.route('/stats/feedings')
+@login_required
+def feeding_stats():
+    days = request.args.get('days', 7, type=int)
+    if days not in current_app.config['STATS_PERIODS']:
+        abort(400)
+    _, _, family = Family.get_user_families_and_family()
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    return jsonify(FeedingDailyTotal.get_series(babies, days))
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     form = LoginForm()
     if form.validate_on_submit():
         user = db.session.scalar(
             sa.select(User).where(User.username == form.username.data))
-        if user is None or not user.check_password(form.password.data):
-            flash('Invalid username or password')
-            return redirect(url_for('login'))
+        try:
+            if user is None or not user.check_password(form.password.data):
+                flash('Invalid username or password')
+                return redirect(url_for('main.login'))
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
+        except HashingBusy:
+            flash('We are handling a lot of sign-ins right now, please try again in a moment.')
+            return render_template('login.html', title='Sign In', form=form), 503
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or urlsplit(next_page).netloc != '':
-            next_page = url_for('index')
+            next_page = url_for('main.index')
         return redirect(next_page)
     return render_template('login.html', title='Sign In', form=form)
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     form = RegistrationForm()
     if form.validate_on_submit():
+        family = None
         if form.family_code.data:  # If a family code is provided, join the existing family
+            if not family_code_attempt_allowed():
+                flash('Too many family code attempts. Please wait a few minutes and try again.', 'error')
+                return render_template('register.html', title='Register', form=form), 429
             family = Family.get_family_from_code(form.family_code.data)
             if not family:
                 flash('Invalid family code.', 'error')
                 return render_template('register.html', title='Register', form=form)
-        else:  # Otherwise, create a new family and baby profile
-
-            family = Family.create_family(name = form.family_name.data)
-            Baby.create_baby(name=form.baby_name.data, date_of_birth=form.baby_dob.data, family_id=family.id)
 
-        # Create a new user and associate with the family
-        _ = User.create_user(username=form.username.data, email=form.email.data, password = form.password.data, family=family)
+        # Create the user, and a new family and baby profile if not joining one, in one transaction
+        try:
+            User.register(username=form.username.data, email=form.email.data, password=form.password.data,
+                          family=family, family_name=form.family_name.data,
+                          baby_name=form.baby_name.data, baby_dob=form.baby_dob.data)
+        except DuplicateUserError as e:
+            field = getattr(form, e.field or 'username')
+            field.errors.append(form.DUPLICATE_MESSAGES.get(e.field, 'Please use a different username or email address.'))
+            return render_template('register.html', title='Register', form=form)
+        except HashingBusy:
+            flash('We are handling a lot of sign-ups right now, please try again in a moment.')
+            return render_template('register.html', title='Register', form=form), 503
 
         flash('Congratulations, you are now a registered user!')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', title='Register', form=form)
 
-@app.route('/user/<username>')
+@bp.route('/user/<username>')
 @login_required
 def user(username):
     user, families, family = Family.get_user_families_and_family()
     babies, _ = Family.get_family_data(family, fetch_babies=True, fetch_recipes=False)
 
-    # Collect feedings for all babies in the selected family
-    feedings = Feeding.get_feedings(babies)
+    # Collect one page of feedings for all babies in the selected family
+    feedings, next_cursor = Feeding.get_feedings_page(
+        babies, cursor=request.args.get('before'), per_page=current_app.config['FEEDINGS_PER_PAGE'])
+    older_url = url_for('main.user', username=username, family_id=family.id if family else None, before=next_cursor) \
+        if next_cursor else None
 
-    return render_template('user.html', user=user, families=families, family=family, feedings=feedings)
+    predictions = list(zip(babies, get_predictions([baby.id for baby in babies])))
 
+    return render_template('user.html', user=user, families=families, family=family, feedings=feedings,
+                           older_url=older_url, predictions=predictions)
 
-@app.route('/add_feeding', methods=['GET', 'POST'])
+
+@bp.route('/events')
+@login_required
+def family_events():
+    """Server-sent events stream of new activity in the selected family."""
+    _, _, family = Family.get_user_families_and_family()
+    if family is None:
+        abort(404)
+    family_id = family.id
+    try:
+        subscription = events.subscribe(family_id)
+    except events.TooManySubscribers:
+        return Response('Too many live connections, try again later.', 503, headers={'Retry-After': '30'})
+    heartbeat = current_app.config['EVENT_HEARTBEAT_SECONDS']
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'  # stops proxies closing an idle connection
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            events.unsubscribe(family_id, subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/add_feeding', methods=['GET', 'POST'])
 @login_required
 def add_feeding():
     _, families, family = Family.get_user_families_and_family()
     babies, recipes = Family.get_family_data(family, fetch_babies=True, fetch_recipes=True)
+    if family:
+        recipes = Recipe.rank_recipes(recipes, RecipeUsage.get_usage(family.id))
 
     form = EditFeedingForm(babies=babies, recipes=recipes)
 
@@ -112,16 +189,115 @@ def add_feeding():
         )
 
         flash('Your feeding information has been saved.')
-        return redirect(url_for('add_feeding'))
+        return redirect(url_for('main.add_feeding'))
 
     return render_template('add_feeding.html', title='Add Feeding', families=families, family=family, recipes=recipes, form=form)
 
-@app.route('/add_recipe', methods=['GET', 'POST'])
+@bp.route('/add_changing', methods=['GET', 'POST'])
+@login_required
+def add_changing():
+    _, families, family = Family.get_user_families_and_family()
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    form = AddChangingForm(babies=babies)
+
+    if form.validate_on_submit():
+        Changing.create_changing(
+            baby_id=form.baby_id.data,
+            timestamp=form.timestamp.data,
+            wet_nappy=form.wet_nappy.data,
+            poop_amount=form.poop_amount.data,
+        )
+        flash('Your changing has been saved.')
+        return redirect(url_for('main.add_changing', family_id=family.id))
+
+    return render_template('add_changing.html', title='Add Changing', families=families, family=family, form=form)
+
+@bp.route('/add_sleeping', methods=['GET', 'POST'])
+@login_required
+def add_sleeping():
+    _, families, family = Family.get_user_families_and_family()
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    form = AddSleepingForm(babies=babies)
+
+    if form.validate_on_submit():
+        Sleeping.create_sleeping(
+            baby_id=form.baby_id.data,
+            start_timestamp=form.start_timestamp.data,
+            end_timestamp=form.end_timestamp.data,
+        )
+        flash('Your sleep has been saved.')
+        return redirect(url_for('main.add_sleeping', family_id=family.id))
+
+    return render_template('add_sleeping.html', title='Add Sleep', families=families, family=family, form=form)
+
+@bp.route('/add_note', methods=['GET', 'POST'])
+@login_required
+def add_note():
+    _, families, family = Family.get_user_families_and_family()
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    form = AddNoteForm(babies=babies)
+
+    if form.validate_on_submit():
+        Note.create_note(
+            baby_id=form.baby_id.data,
+            timestamp=form.timestamp.data,
+            extra=form.extra.data,
+        )
+        flash('Your note has been saved.')
+        return redirect(url_for('main.add_note', family_id=family.id))
+
+    return render_template('add_note.html', title='Add Note', families=families, family=family, form=form)
+
+@bp.route('/timeline')
+@login_required
+def timeline():
+    _, families, family = Family.get_user_families_and_family()
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    baby_names = {baby.id: baby.name for baby in babies}
+
+    baby_events, next_cursor = get_baby_events_page(
+        babies, cursor=request.args.get('before'), per_page=current_app.config['FEEDINGS_PER_PAGE'])
+    older_url = url_for('main.timeline', family_id=family.id, before=next_cursor) if next_cursor else None
+
+    return render_template('timeline.html', title='Timeline', families=families, family=family,
+                           baby_events=baby_events, baby_names=baby_names, older_url=older_url)
+
+@bp.route('/search')
+@login_required
+def search():
+    _, families, family = Family.get_user_families_and_family()
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_next = [], False
+    if family and query:
+        documents, has_next = search_documents(family.id, query, page=page,
+                                               per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
+        results = [(document, snippet(document, query)) for document in documents]
+    babies, _ = Family.get_family_data(family, fetch_babies=True)
+    baby_names = {baby.id: baby.name for baby in babies}
+
+    def page_url(number):
+        return url_for('main.search', family_id=family.id, q=query, page=number)
+    prev_url = page_url(page - 1) if family and query and page > 1 else None
+    next_url = page_url(page + 1) if has_next else None
+    return render_template('search.html', title='Search', families=families, family=family, query=query,
+                           results=results, baby_names=baby_names, prev_url=prev_url, next_url=next_url)
+
+@bp.route('/add_recipe', methods=['GET', 'POST'])
 @login_required
 def add_recipe():
     form = AddRecipeForm()
     _, families, family = Family.get_user_families_and_family()
     _, recipes = Family.get_family_data(family, fetch_babies=False, fetch_recipes=True)
+    usage, ingredients = {}, []
+    ingredient = request.args.get('ingredient')
+    if family:
+        usage = RecipeUsage.get_usage(family.id)
+        ingredients = RecipeIngredient.get_family_ingredients(family.id)
+        recipes = Recipe.rank_recipes(recipes, usage)
+        if ingredient:
+            recipe_ids = dict(ingredients).get(ingredient, [])
+            recipes = [recipe for recipe in recipes if recipe.id in recipe_ids]
 
     if form.validate_on_submit():
         Recipe.create_recipe(
@@ -133,10 +309,11 @@ def add_recipe():
         )
 
         flash('Recipe added successfully!')
-        return redirect(url_for('index'))
-    return render_template('add_recipe.html', title='Add Recipe', families=families, family=family, recipes=recipes, form=form)
+        return redirect(url_for('main.index'))
+    return render_template('add_recipe.html', title='Add Recipe', families=families, family=family, recipes=recipes,
+                           usage=usage, ingredients=ingredients, ingredient=ingredient, form=form)
 
-@app.route('/add_baby', methods=['GET', 'POST'])
+@bp.route('/add_baby', methods=['GET', 'POST'])
 @login_required
 def add_baby():
     form = AddBabyForm()
@@ -149,19 +326,22 @@ def add_baby():
             family_id=family.id
         )
         flash('Baby added successfully!')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('add_baby.html', title='Add Baby', families=families, family=family, form=form)
 
-@app.route('/add_family', methods=['GET', 'POST'])
+@bp.route('/add_family', methods=['GET', 'POST'])
 @login_required
 def add_family():
     form = AddFamilyForm()
     if form.validate_on_submit():
         if form.family_code.data:  # If a family code is provided, join the existing family
+            if not family_code_attempt_allowed():
+                flash('Too many family code attempts. Please wait a few minutes and try again.', 'error')
+                return render_template('add_family.html', title='Add Family', form=form), 429
             family = Family.get_family_from_code(form.family_code.data)
             if not family:
                 flash('Invalid family code.', 'error')
-                return render_template('register.html', title='Register', form=form)
+                return render_template('add_family.html', title='Add Family', form=form)
         else:
             flash("You must enter a valid family code.", "error")
             return render_template('add_family.html', title='Add Family', form=form)
@@ -173,40 +353,12 @@ def add_family():
         existing_association = user.check_user_family_association(family)
         if existing_association:
             flash("You're already part of this family!", "info")
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
 
         # Manually insert into the association table
         user.add_family(family)
 
         flash('Family added successfully!')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     return render_template('add_family.html', title='Add Family', form=form)
-
-def admin_required(func):
-    """Decorator to restrict access to admins only."""
-    from functools import wraps
-    from flask import abort
-
-    @wraps(func)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_admin:
-            abort(403)  # Forbidden
-        return func(*args, **kwargs)
-
-    return decorated_function
-
-@app.route('/admin')
-@login_required
-@admin_required
-def admin():
-    users_fams = db.session.execute(sa.select(users_families)).fetchall()
-    users = User.query.all()
-    families = Family.query.all()
-    babies = Baby.query.all()
-    recipes = Recipe.query.all()
-    feedings = Feeding.query.order_by(Feeding.timestamp.desc()).all()
-    # changes = Change.query.order_by(Change.timestamp.desc()).all()
-    # sleeps = Sleep.query.order_by(Sleep.timestamp.desc()).all()
-
-    return render_template('admin.html', users_families=users_fams, users=users, families=families, babies=babies, recipes=recipes, feedings=feedings)# , changes=changes, sleeps=sleeps)
@@ -0,0 +1,82 @@
+from app import db
+from app.models import SearchDocument, SearchTerm, search_tokens, POSTGRES_SEARCH_VECTOR, SEARCH_FTS_TABLE, \
+    SEARCH_TITLE_WEIGHT, SEARCH_TOKEN
+import math
+import sqlalchemy as sa
+
+SNIPPET_LENGTH = 160
+
+
+def search(family_id, query, page=1, per_page=20):
+    """Rank a family's recipes and notes against `query`, every word of which must match the start of a word.
+
+    Returns (documents, has_next) for the 1-based `page`.
+    """
+    tokens = list(dict.fromkeys(search_tokens(query)))
+    if not tokens:
+        return [], False
+    offset = (page - 1) * per_page
+    backend = {'fts5': _search_fts5, 'postgres': _search_postgres, 'python': _search_python}[SearchDocument.backend()]
+    documents = backend(family_id, tokens, offset, per_page + 1)
+    return documents[:per_page], len(documents) > per_page
+
+def _search_fts5(family_id, tokens, offset, limit):
+    fts = sa.table(SEARCH_FTS_TABLE, sa.column('rowid'))
+    # Tokens are bare words, so quoting each one keeps FTS5 query syntax out of user input
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    rank = sa.func.bm25(sa.literal_column(SEARCH_FTS_TABLE), SEARCH_TITLE_WEIGHT, 1.0)  # lower is better
+    return db.session.scalars(
+        sa.select(SearchDocument)
+        .join(fts, fts.c.rowid == SearchDocument.id)
+        .where(sa.literal_column(SEARCH_FTS_TABLE).op('MATCH')(match), SearchDocument.family_id == family_id)
+        .order_by(rank, SearchDocument.id.desc())
+        .offset(offset).limit(limit)
+    ).all()
+
+def _search_postgres(family_id, tokens, offset, limit):
+    # Must match the indexed expression exactly for the GIN index to be used
+    vector = sa.literal_column(POSTGRES_SEARCH_VECTOR)
+    query = sa.func.to_tsquery('english', ' & '.join(f'{token}:*' for token in tokens))
+    return db.session.scalars(
+        sa.select(SearchDocument)
+        .where(vector.op('@@')(query), SearchDocument.family_id == family_id)
+        .order_by(sa.func.ts_rank(vector, query).desc(), SearchDocument.id.desc())
+        .offset(offset).limit(limit)
+    ).all()
+
+def _search_python(family_id, tokens, offset, limit):
+    """Score documents containing every token by summed tf-idf over the SearchTerm postings."""
+    total = db.session.scalar(sa.select(sa.func.count()).where(SearchDocument.family_id == family_id))
+    scores = None
+    for token in tokens:
+        # A prefix match is a range scan on the term primary key
+        upper = token[:-1] + chr(ord(token[-1]) + 1)
+        weights = dict(db.session.execute(
+            sa.select(SearchTerm.document_id, sa.func.sum(SearchTerm.weight))
+            .join(SearchDocument)
+            .where(SearchTerm.term >= token, SearchTerm.term < upper, SearchDocument.family_id == family_id)
+            .group_by(SearchTerm.document_id)
+        ).all())
+        idf = math.log(1 + total / len(weights)) if weights else 0
+        scores = {document_id: (scores[document_id] if scores is not None else 0) + weight * idf
+                  for document_id, weight in weights.items() if scores is None or document_id in scores}
+        if not scores:
+            return []
+    ranked = sorted(scores, key=lambda document_id: (-scores[document_id], -document_id))[offset:offset + limit]
+    documents = {document.id: document for document in db.session.scalars(
+        sa.select(SearchDocument).where(SearchDocument.id.in_(ranked)))}
+    return [documents[document_id] for document_id in ranked]
+
+def snippet(document, query, length=SNIPPET_LENGTH):
+    """A window of the document's text around the first word matching `query`."""
+    text = ' '.join((document.body or '').split())
+    if len(text) <= length:
+        return text
+    prefixes = tuple(search_tokens(query))
+    start = 0
+    for word in SEARCH_TOKEN.finditer(text.lower()):
+        if prefixes and word.group().startswith(prefixes):
+            start = max(0, word.start() - length // 4)
+            break
+    excerpt = text[start:start + length]
+    return ('…' if start else '') + excerpt + ('…' if start + length < len(text) else '')
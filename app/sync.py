@@ -0,0 +1,143 @@
+from app import db, events
+from app.cache import invalidate
+from app.forms import EditFeedingForm, AddChangingForm, AddSleepingForm
+from app.models import Baby, Changing, Family, Feeding, FeedingArchive, FeedingDailyTotal, Recipe, RecipeUsage, Sleeping, \
+    serialize_row
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+import uuid
+from werkzeug.datastructures import MultiDict
+
+MAX_RECORDS = 500
+
+# Records clients can create offline: the model, the web form that validates one, the columns a client
+# may set, and the live event kind published for it
+SYNC_TYPES = {
+    'feedings': (Feeding, EditFeedingForm, ['baby_id', 'timestamp', 'feeding_type', 'breast_duration',
+                                            'bottle_amount', 'solid_amount', 'recipe_id'], 'feeding'),
+    'changings': (Changing, AddChangingForm, ['baby_id', 'timestamp', 'wet_nappy', 'poop_amount'], 'changing'),
+    'sleepings': (Sleeping, AddSleepingForm, ['baby_id', 'start_timestamp', 'end_timestamp'], 'sleeping'),
+}
+
+
+class SyncError(Exception):
+    """A batch was rejected as a whole; `errors` lists {type, index, client_id, errors} for each bad record."""
+
+    def __init__(self, errors):
+        super().__init__('Invalid records in sync batch')
+        self.errors = errors
+
+
+def _formdata(record):
+    """JSON values as the strings a submitted form would carry (false and null become absent)."""
+    data = MultiDict()
+    for key, value in record.items():
+        if value is None or value is False:
+            continue
+        data[key] = 'y' if value is True else str(value)
+    return data
+
+def _client_id(value):
+    """Normalise a client-generated UUID, or return None if it is not one."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+def validate_changes(changes, family_id):
+    """Validate each record in `changes` ({type: [record, ...]}) with the form the web pages use.
+
+    Returns {type: {client_id: values}}, the last copy winning if a client id repeats; raises SyncError.
+    """
+    if not isinstance(changes, dict) or set(changes) - set(SYNC_TYPES):
+        raise SyncError([{'errors': {'changes': [f'Expected an object with any of: {", ".join(SYNC_TYPES)}.']}}])
+    if sum(len(records) for records in changes.values() if isinstance(records, list)) > MAX_RECORDS:
+        raise SyncError([{'errors': {'changes': [f'At most {MAX_RECORDS} records per sync.']}}])
+
+    babies = db.session.execute(sa.select(Baby.id, Baby.name).where(Baby.family_id == family_id)).all()
+    recipes = db.session.execute(sa.select(Recipe.id, Recipe.recipe_name).where(Recipe.family_id == family_id)).all()
+    valid, errors = {}, []
+    for record_type, records in changes.items():
+        if not isinstance(records, list):
+            errors.append({'type': record_type, 'errors': {'changes': ['Expected a list of records.']}})
+            continue
+        _, form_class, fields, _ = SYNC_TYPES[record_type]
+        valid[record_type] = {}
+        for index, record in enumerate(records):
+            client_id = _client_id(record.get('client_id')) if isinstance(record, dict) else None
+            if client_id is None:
+                errors.append({'type': record_type, 'index': index, 'errors': {'client_id': ['A UUID is required.']}})
+                continue
+            form = form_class(formdata=_formdata(record), meta={'csrf': False})
+            form.baby_id.choices = [tuple(baby) for baby in babies]
+            if record_type == 'feedings':
+                form.recipe_id.choices = [tuple(recipe) for recipe in recipes]
+            if not form.validate():
+                errors.append({'type': record_type, 'index': index, 'client_id': client_id, 'errors': form.errors})
+                continue
+            valid[record_type][client_id] = {field: getattr(form, field).data for field in fields}
+    if errors:
+        raise SyncError(errors)
+    return valid
+
+def _insert(table):
+    """An INSERT that supports ON CONFLICT for the current database (SQLite or PostgreSQL)."""
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}[db.session.get_bind().dialect.name]
+    return dialect.insert(table)
+
+def apply_changes(valid, family_id, user_id):
+    """Upsert validated records by client id in one transaction, under a single new family data version.
+
+    Records whose stored values already match are left alone, so retrying a batch changes nothing and
+    does not bump the version. Returns {type: [{'client_id', 'id'}]} for the records written.
+    """
+    _, version = Family.bump_data_version(family_id=family_id)
+    baby_ids = sa.select(Baby.id).where(Baby.family_id == family_id)
+    written, published = {}, []
+    moved_from = set()  # babies whose feedings an update may move to another baby
+    for record_type, records in valid.items():
+        model, _, fields, kind = SYNC_TYPES[record_type]
+        client_ids = list(records)
+        if model is Feeding and client_ids:
+            # Feedings synced long ago may have been archived since; they are already stored
+            archived = set(db.session.scalars(
+                sa.select(FeedingArchive.client_id).where(FeedingArchive.client_id.in_(client_ids))))
+            client_ids = [client_id for client_id in client_ids if client_id not in archived]
+            moved_from.update(db.session.scalars(
+                sa.select(Feeding.baby_id).where(Feeding.client_id.in_(client_ids), Feeding.baby_id.in_(baby_ids))))
+        if not client_ids:
+            continue
+
+        table = model.__table__
+        extra = {'user_id': user_id} if model is Feeding else {}
+        statement = _insert(table).values([
+            dict(records[client_id], client_id=client_id, version=version, **extra) for client_id in client_ids
+        ])
+        # Only touch an existing row if it belongs to this family and something actually changed
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.client_id],
+            set_={field: statement.excluded[field] for field in fields + ['version']},
+            where=sa.and_(
+                table.c.baby_id.in_(baby_ids),
+                sa.or_(*(table.c[field].is_distinct_from(statement.excluded[field]) for field in fields)),
+            ),
+        ).returning(*table.c)
+        rows = db.session.execute(statement).all()
+        written[record_type] = [{'client_id': row.client_id, 'id': row.id} for row in rows]
+        published += [(kind, serialize_row(row)) for row in rows]
+
+    if not published:
+        db.session.rollback()
+        return written
+    db.session.commit()
+
+    feedings = [data for kind, data in published if kind == 'feeding']
+    if feedings:
+        changed_babies = list({data['baby_id'] for data in feedings} | moved_from)
+        FeedingDailyTotal.rebuild(changed_babies)
+        # An update may have moved a feeding off a recipe, so recount all of the family's recipes
+        RecipeUsage.rebuild(list(db.session.scalars(sa.select(Recipe.id).where(Recipe.family_id == family_id))))
+        invalidate(('recipe-usage', family_id), *(('prediction', baby_id) for baby_id in changed_babies))
+    for kind, data in published:
+        events.publish(family_id, kind, data)
+    return written
@@ -0,0 +1,69 @@
+"""Measure login throughput under concurrent sign-ins.
+
+Usage: python benchmarks/bench_login.py [--threads 16] [--requests 200] [--workers 2]
+
+Runs the login route through the Flask test client from several threads
+against a throwaway SQLite database and prints requests per second.
+Use --workers 0 to compare against hashing inline in the request thread.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS (0 = inline)')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_file.name
+    os.environ['DB_ENGINE_PROFILE'] = 'sqlite-wal'
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASH_QUEUE_DEPTH'] = str(max(args.threads, 1))
+    os.environ['SQL_PROFILING'] = '0'
+
+    from app import create_app, db
+    from app.models import User, Family
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, TESTING=True)
+
+    with app.app_context():
+        db.create_all()
+        User.create_user('bench', 'bench@example.com', 'bench-password', Family.create_family('Bench'))
+
+    statuses = {}
+    lock = threading.Lock()
+    per_thread = args.requests // args.threads
+
+    def worker():
+        client = app.test_client()
+        for _ in range(per_thread):
+            response = client.post('/login', data={'username': 'bench', 'password': 'bench-password'})
+            client.get('/logout')
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = per_thread * args.threads
+    print(f'{total} logins from {args.threads} threads with {args.workers} hash workers: '
+          f'{total / elapsed:.1f} req/s, statuses {statuses}')
+    os.unlink(db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Route-level latency and query-count benchmarks.
+
+Usage:
+    python benchmarks/bench_routes.py [--families 5] [--days 365] [--repeat 20]
+                                      [--save-baseline] [--baseline benchmarks/results/baseline.json]
+
+Builds a throwaway SQLite database with benchmarks/datagen.py, signs in
+through the Flask test client and requests each route --repeat times,
+reporting p50/p95 latency and the number of SQL queries per request.
+With --save-baseline the results are written to the baseline file;
+otherwise they are compared against it when it exists.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'baseline.json')
+
+# (name, url); {username} and {family_id} are filled in once the data exists
+ROUTES = [
+    ('index', '/'),
+    ('user', '/user/{username}'),
+    ('user_page_2', '/user/{username}?family_id={family_id}&before={cursor}'),
+    ('timeline', '/timeline'),
+    ('add_feeding', '/add_feeding'),
+    ('add_recipe', '/add_recipe'),
+    ('feeding_stats_30', '/stats/feedings?days=30'),
+    ('feeding_stats_365', '/stats/feedings?days=365'),
+    ('api_feedings', '/api/v1/families/{family_id}/feedings'),
+    ('admin', '/admin'),
+    ('admin_feedings', '/admin/feedings'),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run(args):
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_file.name
+    os.environ['PASSWORD_HASH_WORKERS'] = '0'
+    os.environ['SQL_PROFILING'] = '0'
+
+    from app import create_app, db
+    from app.instrumentation import count_queries
+    from app.models import Baby, Family, Feeding, encode_cursor
+    from benchmarks import datagen
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False)
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        username = datagen.generate(families=args.families, babies_per_family=args.babies, days=args.days,
+                                    feedings_per_day=args.feedings_per_day)
+        family_id = db.session.scalar(db.select(Family.id).order_by(Family.id))
+        babies = db.session.scalars(db.select(Baby).where(Baby.family_id == family_id)).all()
+        page = Feeding.get_feedings(babies, limit=app.config['FEEDINGS_PER_PAGE'])
+        cursor = encode_cursor(page[-1].timestamp, page[-1].id)
+        total = db.session.scalar(db.select(db.func.count(Feeding.id)))
+        print(f'Generated {total} feedings in {time.perf_counter() - started:.1f}s')
+
+        client = app.test_client()
+        client.post('/login', data={'username': username, 'password': datagen.PASSWORD})
+
+        results = {}
+        for name, template in ROUTES:
+            url = template.format(username=username, family_id=family_id, cursor=cursor)
+            timings, queries = [], []
+            for _ in range(args.repeat):
+                with count_queries() as counter:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(counter.count)
+                if response.status_code != 200:
+                    raise SystemExit(f'{url} returned {response.status_code}')
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+                'queries': max(queries),
+            }
+    os.unlink(db_file.name)
+    return {'params': vars(args) | {'feedings': total}, 'routes': results}
+
+def report(results, baseline=None):
+    base_routes = baseline['routes'] if baseline else {}
+    print(f"{'route':<20}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}" + (f"{'p50 vs base':>14}" if baseline else ''))
+    for name, stats in results['routes'].items():
+        line = f"{name:<20}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['queries']:>9}"
+        if name in base_routes and base_routes[name]['p50_ms']:
+            change = (stats['p50_ms'] / base_routes[name]['p50_ms'] - 1) * 100
+            line += f'{change:>+13.1f}%'
+            if stats['queries'] != base_routes[name]['queries']:
+                line += f" (queries {base_routes[name]['queries']} -> {stats['queries']})"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--families', type=int, default=5)
+    parser.add_argument('--babies', type=int, default=2, help='Babies per family')
+    parser.add_argument('--days', type=int, default=365, help='Days of feeding history')
+    parser.add_argument('--feedings-per-day', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=20, help='Requests per route')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['params'] != results['params'] | {'save_baseline': baseline['params'].get('save_baseline')}:
+            print('Note: baseline was recorded with different parameters.')
+    report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
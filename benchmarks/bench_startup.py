@@ -0,0 +1,70 @@
+"""Measure how long the app takes to import and to build.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+
+Each run is a fresh interpreter, so the numbers reflect what a gunicorn
+worker, a `flask` CLI command or a test process pays at startup. Prints the
+median time to `import app`, to call create_app() with everything enabled
+and with the admin and import blueprints disabled, and the slowest imports
+reported by `python -X importtime`.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMER = '''
+import time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+print(imported - start, time.perf_counter() - imported)
+'''
+
+
+def time_startup(runs, env):
+    imports, builds = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', TIMER], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout
+        import_s, build_s = map(float, output.split())
+        imports.append(import_s * 1000)
+        builds.append(build_s * 1000)
+    return statistics.median(imports), statistics.median(builds)
+
+def slowest_imports(top, env):
+    """Return (cumulative ms, module) for the slowest imports, parsed from -X importtime's stderr."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True).stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        timings.append((int(cumulative) / 1000, module.rstrip()))
+    return sorted(timings, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='How many of the slowest imports to list')
+    args = parser.parse_args()
+
+    env = dict(os.environ, SQL_PROFILING='0')
+    lite_env = dict(env, ADMIN_ENABLED='0', IMPORTS_ENABLED='0')
+    for label, run_env in (('full app', env), ('admin/imports off', lite_env)):
+        import_ms, build_ms = time_startup(args.runs, run_env)
+        print(f'{label:<20} import app: {import_ms:7.1f}ms   create_app(): {build_ms:7.1f}ms')
+
+    print('\nSlowest imports (cumulative):')
+    for ms, module in slowest_imports(args.top, env):
+        print(f'{ms:8.1f}ms  {module}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Synthetic data for benchmarks: families, babies, recipes and years of feedings.
+
+Rows are bulk inserted through the model tables, so generating hundreds of
+thousands of feedings takes seconds rather than minutes.
+"""
+from datetime import date, datetime, timedelta
+import random
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import Baby, Family, Feeding, FeedingDailyTotal, Recipe, User
+
+BATCH_SIZE = 5000
+PASSWORD = 'bench-password'
+
+
+def generate(families=5, babies_per_family=2, days=365, feedings_per_day=8, users_per_family=2, seed=1):
+    """Populate the current app's database. Returns the username of an admin member of the first family.
+
+    Call inside an app context, on an empty database.
+    """
+    rng = random.Random(seed)
+    password_hash = _hash_once()
+    start = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+
+    admin_username = None
+    for f in range(families):
+        family = Family(name=f'Family {f}', code=Family.generate_family_code(), data_version=1)
+        users = [User(username=f'user{f}_{u}', email=f'user{f}_{u}@example.com', password_hash=password_hash,
+                      is_admin=(f == 0 and u == 0))
+                 for u in range(users_per_family)]
+        for user in users:
+            user.families.append(family)
+        babies = [Baby(name=f'Baby {f}_{b}', date_of_birth=start.date(), family=family)
+                  for b in range(babies_per_family)]
+        recipes = [Recipe(family=family, recipe_name=f'Recipe {r}', recipe_ingredients='carrot, potato, butter',
+                          recipe_instructions='Steam and mash.', amount=100)
+                   for r in range(3)]
+        db.session.add_all(users + babies + recipes)
+        db.session.commit()
+        admin_username = admin_username or users[0].username
+
+        rows = []
+        for baby in babies:
+            for day in range(days):
+                for n in range(feedings_per_day):
+                    feeding_type = rng.choice(('breast', 'bottle', 'solids'))
+                    rows.append({
+                        'baby_id': baby.id,
+                        'user_id': rng.choice(users).id,
+                        'timestamp': start + timedelta(days=day, minutes=n * (1440 // feedings_per_day) + rng.randint(0, 59)),
+                        'feeding_type': feeding_type,
+                        'breast_duration': rng.randint(5, 30) if feeding_type == 'breast' else None,
+                        'bottle_amount': rng.randint(60, 240) if feeding_type == 'bottle' else None,
+                        'solid_amount': rng.randint(20, 150) if feeding_type == 'solids' else None,
+                        'recipe_id': rng.choice(recipes).id if feeding_type == 'solids' else None,
+                        'version': 1,
+                    })
+                    if len(rows) >= BATCH_SIZE:
+                        db.session.execute(sa.insert(Feeding), rows)
+                        rows = []
+        if rows:
+            db.session.execute(sa.insert(Feeding), rows)
+        db.session.commit()
+
+    FeedingDailyTotal.rebuild()
+    return admin_username
+
+def _hash_once():
+    """Hash the shared benchmark password once; hashing per user would dominate generation time."""
+    user = User(username='', email='')
+    user.set_password(PASSWORD)
+    return user.password_hash
@@ -1,7 +1,100 @@
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# Named database engine profiles, selected with DB_ENGINE_PROFILE.
+# 'engine_options' go to SQLAlchemy's create_engine, 'pragmas' are run on every new SQLite connection.
+ENGINE_PROFILES = {
+    'sqlite-dev': {
+        'engine_options': {},
+        'pragmas': {},
+    },
+    'sqlite-wal': {
+        'engine_options': {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'connect_args': {'timeout': int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000)) / 1000},
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000)),
+            'foreign_keys': 'ON',
+        },
+    },
+    'postgres-pooled': {
+        'engine_options': {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_pre_ping': True,
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'connect_args': {'options': f"-c statement_timeout={int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000))}"},
+        },
+        'pragmas': {},
+    },
+}
+
+
+class ConfigError(ValueError):
+    """Raised when an environment setting has no valid meaning."""
+    pass
+
+def engine_profile(name):
+    """The ENGINE_PROFILES entry called `name`; raises ConfigError naming the valid choices."""
+    try:
+        return ENGINE_PROFILES[name]
+    except KeyError:
+        raise ConfigError(f"Unknown DB_ENGINE_PROFILE {name!r}; choose one of {', '.join(ENGINE_PROFILES)}.") from None
+
+DEFAULT_SECRET_KEY = 'you-will-never-guess'
+
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE') or \
+        ('sqlite-dev' if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else 'postgres-pooled')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_profile(DB_ENGINE_PROFILE)['engine_options']
+    # Read replicas as comma-separated URLs; safe-method requests read from one of them
+    SQLALCHEMY_BINDS = {f'replica{number}': url for number, url in
+                        enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')))}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))  # reads go to the primary this long after a write
+    SQLITE_PRAGMAS = engine_profile(DB_ENGINE_PROFILE)['pragmas']
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 32))
+    PASSWORD_HASH_TIMEOUT = 10
+    EVENT_BROKER_URL = os.environ.get('EVENT_BROKER_URL')
+    EVENT_HEARTBEAT_SECONDS = 15
+    # /events streams are plain generators, so each connected client holds one server thread for as
+    # long as it stays connected. Keep this below the threads each worker process runs (e.g. gunicorn
+    # --threads), or the streams starve ordinary requests; clients past the cap get a 503.
+    EVENT_MAX_SUBSCRIBERS = int(os.environ.get('EVENT_MAX_SUBSCRIBERS', 20))
+    FAMILY_CODE_ATTEMPTS = 10
+    FAMILY_CODE_WINDOW_SECONDS = 300
+    FEEDINGS_PER_PAGE = 20
+    FEEDING_ARCHIVE_AFTER_DAYS = int(os.environ.get('FEEDING_ARCHIVE_AFTER_DAYS', 90))
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '1') == '1'
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 20))
+    CONTEXT_CACHE_TTL = int(os.environ.get('CONTEXT_CACHE_TTL', 60))
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')  # memory, filesystem or none
+    FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR') or os.path.join(basedir, 'fragment_cache')
+    FRAGMENT_CACHE_SIZE = 10000
+    FRAGMENT_CACHE_TTL = 24 * 60 * 60
+    ADMIN_ENABLED = os.environ.get('ADMIN_ENABLED', '1') == '1'
+    ADMIN_ROWS_PER_PAGE = 50
+    STATS_PERIODS = (7, 30, 365)
+    IMPORTS_ENABLED = os.environ.get('IMPORTS_ENABLED', '1') == '1'
+    IMPORT_BATCH_SIZE = 500
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')  # auto (FTS5 or Postgres full text) or python
+    SEARCH_RESULTS_PER_PAGE = 20
+    JOB_POLL_SECONDS = 2
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_BACKOFF_SECONDS = 30  # doubled after each failed attempt
+    JOB_LEASE_SECONDS = 15 * 60  # a running job whose worker vanished is retried after this long
+    # Jobs `flask worker` queues by itself: job name -> seconds between runs
+    JOB_SCHEDULE = {
+        'archive-feedings': 24 * 60 * 60,
+        'rebuild-recipe-usage': 6 * 60 * 60,
+    }
@@ -1,17 +1,24 @@
-import os
-os.environ['DATABASE_URL'] = 'sqlite://'
-
-from app import db, app
+from app import create_app, db
 from app.models import User, Family, Baby, users_families
-from app.routes import generate_code
+from config import Config
 from datetime import datetime
 
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLITE_PRAGMAS = {}
+    PASSWORD_HASH_WORKERS = 0
+
+
+app = create_app(TestConfig)
+
 def add_user(family_name, username, email, family_code=None, is_admin=False, baby_name=None, baby_date_of_birth=None):
     with app.app_context():
         # Create or fetch the family
         family = Family.query.filter_by(code=family_code).first()
         if not family:
-            family_code = generate_code()
+            family_code = Family.generate_family_code()
             family = Family(name=family_name, code=family_code)
             db.session.add(family)
             db.session.commit()
@@ -49,6 +56,8 @@ def get_family_code(user_id):
         return family.code
 
 if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
 
     user1 = add_user(family_name = "Chambers",
             username = "jamie",
@@ -0,0 +1,53 @@
+from app import create_app, db
+from app.cache import context_cache
+from app.models import User, Family, Baby
+from config import Config
+from datetime import date
+import pytest
+
+PASSWORD = 'test-password'
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    SQLITE_PRAGMAS = {}
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+    WTF_CSRF_ENABLED = False
+    SQL_PROFILING = False
+    FRAGMENT_CACHE_BACKEND = 'none'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        # Only the primary: replica binds another test's app registered have no engine here
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+    context_cache.clear()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_family(app):
+    """Register a user whose new family has `babies` babies; returns (user, family)."""
+    def make(username='parent', babies=1):
+        user = User.register(username=username, email=f'{username}@example.com', password=PASSWORD,
+                             family_name=f'{username} family', baby_name=f'{username} baby 0', baby_dob=date(2026, 1, 1))
+        family = user.families[0]
+        for number in range(1, babies):
+            db.session.add(Baby(name=f'{username} baby {number}', date_of_birth=date(2026, 1, 1), family=family))
+        db.session.commit()
+        return user, family
+    return make
+
+def login(client, username):
+    return client.post('/login', data={'username': username, 'password': PASSWORD})
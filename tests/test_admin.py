@@ -0,0 +1,41 @@
+from app import db
+from app.models import User
+from datetime import date
+import pytest
+from tests.conftest import login, PASSWORD
+
+
+@pytest.fixture
+def admin(client, make_family):
+    user, _ = make_family(username='admin')
+    user.is_admin = True
+    db.session.commit()
+    login(client, 'admin')
+    return user
+
+@pytest.mark.parametrize('page', ['0', '-3'])
+def test_browse_table_clamps_page(client, admin, page):
+    response = client.get(f'/admin/users?page={page}')
+    assert response.status_code == 200
+    assert b'admin@example.com' in response.data
+
+def test_pages_render_without_optional_blueprints():
+    from app import create_app
+    from tests.conftest import TestConfig
+
+    class MinimalConfig(TestConfig):
+        ADMIN_ENABLED = False
+        IMPORTS_ENABLED = False
+
+    app = create_app(MinimalConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        assert client.get('/login').status_code == 200
+        User.register(username='parent', email='parent@example.com', password=PASSWORD, family_name='Family',
+                      baby_name='Baby', baby_dob=date(2026, 1, 1))
+        login(client, 'parent')
+        response = client.get('/')
+        assert response.status_code == 200
+        assert b'Admin' not in response.data
+        db.drop_all(bind_key=None)
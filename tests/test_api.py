@@ -0,0 +1,30 @@
+from app import db
+from app.models import Feeding
+from datetime import datetime, timedelta
+import pytest
+from tests.conftest import login
+
+
+@pytest.fixture
+def family(client, make_family):
+    user, family = make_family(babies=2)
+    for number in range(3):
+        db.session.add(Feeding(baby_id=family.babies[0].id, user_id=user.id, timestamp=datetime(2026, 1, 1) + timedelta(hours=number),
+                               feeding_type='bottle', bottle_amount=100, version=1))
+    db.session.commit()
+    login(client, 'parent')
+    return family
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-1', 'since=0&limit=0', 'since=0&limit=-5'])
+def test_limit_is_at_least_one(client, family, query):
+    response = client.get(f'/api/v1/families/{family.id}/feedings?{query}')
+    assert response.status_code == 200
+    assert len(response.json['items']) == 1
+    assert response.json['has_more']
+
+def test_etag_depends_on_resource_and_query(client, family):
+    feedings = client.get(f'/api/v1/families/{family.id}/feedings')
+    etag = feedings.headers['ETag']
+    assert client.get(f'/api/v1/families/{family.id}/feedings', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(f'/api/v1/families/{family.id}/changings', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get(f'/api/v1/families/{family.id}/feedings?limit=1', headers={'If-None-Match': etag}).status_code == 200
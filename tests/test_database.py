@@ -0,0 +1,55 @@
+from app import create_app, db
+from app.models import Family
+from concurrent.futures import ThreadPoolExecutor
+from config import ConfigError, engine_profile
+import pytest
+import sqlalchemy as sa
+from tests.conftest import TestConfig
+
+WRITERS = 8
+WRITES_PER_THREAD = 25
+
+
+@pytest.fixture
+def wal_app(tmp_path):
+    profile = engine_profile('sqlite-wal')
+
+    class WalConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/wal.db'
+        SQLALCHEMY_ENGINE_OPTIONS = profile['engine_options']
+        SQLITE_PRAGMAS = profile['pragmas']
+
+    app = create_app(WalConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def test_wal_profile_applies_pragmas_and_pool(wal_app):
+    pragmas = engine_profile('sqlite-wal')['pragmas']
+    with wal_app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == pragmas['busy_timeout']
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+        assert db.engine.pool.size() == engine_profile('sqlite-wal')['engine_options']['pool_size']
+
+def test_concurrent_writers_do_not_hit_locked_database(wal_app):
+    def write(worker):
+        with wal_app.app_context():
+            for number in range(WRITES_PER_THREAD):
+                db.session.add(Family(name=f'{worker}-{number}', code=f'{worker}-{number}'))
+                db.session.commit()
+
+    # Any 'database is locked' OperationalError would be re-raised by result()
+    with ThreadPoolExecutor(WRITERS) as pool:
+        for future in [pool.submit(write, worker) for worker in range(WRITERS)]:
+            future.result()
+
+    with wal_app.app_context():
+        assert db.session.scalar(sa.select(sa.func.count(Family.id))) == WRITERS * WRITES_PER_THREAD
+
+def test_unknown_engine_profile_is_a_config_error():
+    with pytest.raises(ConfigError, match='sqlite-wal'):
+        engine_profile('sqlite-fast')
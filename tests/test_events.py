@@ -0,0 +1,67 @@
+from app import events
+from app.events import LocalBroker, SocketBroker, TooManySubscribers, run_broker
+from config import ConfigError
+import pytest
+import queue
+import threading
+import time
+from tests.conftest import login
+
+
+def test_subscriber_cap():
+    broker = LocalBroker(max_subscribers=2)
+    first = broker.subscribe(1)
+    broker.subscribe(2)
+    with pytest.raises(TooManySubscribers):
+        broker.subscribe(1)
+    broker.unsubscribe(1, first)
+    broker.subscribe(1)
+
+def test_events_stream_refuses_clients_past_the_cap(app, client, make_family):
+    app.config['EVENT_MAX_SUBSCRIBERS'] = 0
+    events.init_app(app)
+    _, family = make_family()
+    login(client, 'parent')
+    response = client.get(f'/events?family_id={family.id}')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+def start_broker(tmp_path):
+    address = str(tmp_path / 'broker.sock')
+    threading.Thread(target=run_broker, args=(address, b'broker-key'), daemon=True).start()
+    while not (tmp_path / 'broker.sock').exists():
+        time.sleep(0.01)
+    return address
+
+def test_broker_relays_events_between_workers(tmp_path):
+    address = start_broker(tmp_path)
+    sender, receiver = SocketBroker(address, b'broker-key'), SocketBroker(address, b'broker-key')
+    subscription = receiver.subscribe(7)
+
+    # The receiver connects in the background, so publish until it is registered with the broker
+    for _ in range(50):
+        sender.publish(7, {'type': 'note', 'data': {'id': 1}})
+        try:
+            assert subscription.get(timeout=0.1) == {'type': 'note', 'data': {'id': 1}}
+            break
+        except queue.Empty:
+            pass
+    else:
+        pytest.fail('event was never relayed')
+
+def test_broker_refuses_the_default_secret_key(app):
+    app.config['EVENT_BROKER_URL'] = '/tmp/broker.sock'
+    with pytest.raises(ConfigError):
+        events.init_app(app)
+    with pytest.raises(ConfigError):
+        app.test_cli_runner().invoke(args=['event-broker'], catch_exceptions=False)
+
+def test_broker_with_wrong_key_delivers_locally(tmp_path):
+    address = start_broker(tmp_path)
+    broker = SocketBroker(address, b'another-key')
+    subscription = broker.subscribe(7)
+
+    broker.publish(7, {'type': 'note', 'data': {}})
+
+    assert subscription.get(timeout=5) == {'type': 'note', 'data': {}}
+    assert broker._receiver.is_alive()
@@ -0,0 +1,37 @@
+from app.hashing import HashingBusy, PasswordHasher, full_method
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import threading
+from werkzeug.security import generate_password_hash
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_full_method_matches_stored_hash(method):
+    assert full_method(method) == generate_password_hash('secret', method).split('$', 1)[0]
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha256'])
+def test_login_does_not_rehash_for_short_method(app, make_family, method):
+    from app import hasher
+    app.config['PASSWORD_HASH_METHOD'] = method
+    hasher.init_app(app)
+    user, _ = make_family()
+    assert not user.password_needs_rehash()
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    hasher.init_app(app)
+    assert user.password_needs_rehash()
+
+def test_timeout_is_busy_and_holds_the_slot_until_the_hash_finishes(app):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.05, PASSWORD_HASH_QUEUE_DEPTH=1)
+    hasher = PasswordHasher(app)
+    hasher._executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    with pytest.raises(HashingBusy):
+        hasher._run(release.wait)
+    # The timed-out hash is still running, so its slot is still taken
+    with pytest.raises(HashingBusy):
+        hasher._run(len, 'x')
+    release.set()
+    hasher._executor.shutdown(wait=True)
+    hasher._executor = ThreadPoolExecutor(max_workers=1)
+    assert hasher._run(len, 'x') == 1
+    hasher._executor.shutdown()
@@ -0,0 +1,36 @@
+from app import create_app, db
+from app.jobs import enqueue, run_worker
+from app.models import Feeding, FeedingDailyTotal, Job, User
+from datetime import date, datetime
+import pytest
+import sqlalchemy as sa
+from tests.conftest import TestConfig
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/jobs.db'
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_worker_runs_jobs_against_its_own_database(file_app, pool):
+    user = User.register(username='parent', email='parent@example.com', password='pw', family_name='Family',
+                         baby_name='Baby', baby_dob=date(2026, 1, 1))
+    baby_id = user.families[0].babies[0].id
+    db.session.add(Feeding(baby_id=baby_id, user_id=user.id, timestamp=datetime(2026, 1, 2, 8), feeding_type='bottle',
+                           bottle_amount=90, version=1))
+    db.session.commit()
+    job = enqueue('rebuild-daily-totals', baby_ids=[baby_id])
+
+    run_worker(concurrency=1, pool=pool, once=True)
+
+    db.session.expire_all()
+    assert db.session.get(Job, job.id).status == 'done'
+    assert db.session.scalar(sa.select(FeedingDailyTotal.bottle_ml).where(FeedingDailyTotal.baby_id == baby_id)) == 90
@@ -0,0 +1,25 @@
+from app import db
+from app.instrumentation import assert_max_queries
+from app.models import Feeding
+from app.predictions import predict_next_feeds
+from datetime import datetime, timedelta
+
+NOW = datetime(2026, 1, 10, 12, 0)
+
+
+def test_predictions_for_all_babies_in_one_query(make_family):
+    user, family = make_family(babies=3)
+    first, second, third = (baby.id for baby in family.babies)
+    for baby_id, hours in ((first, 3), (second, 4)):
+        for number in range(8):
+            db.session.add(Feeding(baby_id=baby_id, user_id=user.id, feeding_type='bottle', bottle_amount=120, version=1,
+                                   timestamp=NOW - timedelta(hours=hours * (8 - number))))
+    db.session.commit()
+
+    with assert_max_queries(1):
+        predictions = predict_next_feeds([first, second, third], now=NOW)
+
+    assert predictions[first]['rolling_interval_minutes'] == 180
+    assert predictions[first]['next_feed']['expected'] == '2026-01-10T12:00'
+    assert predictions[second]['rolling_interval_minutes'] == 240
+    assert predictions[third] is None
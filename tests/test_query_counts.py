@@ -0,0 +1,38 @@
+from app import db
+from app.cache import context_cache
+from app.instrumentation import assert_max_queries
+from app.models import Feeding, Note
+from datetime import datetime, timedelta
+import pytest
+from tests.conftest import login
+
+# Queries one page may run whatever the number of babies or feedings
+USER_PAGE_QUERIES = 5
+INDEX_PAGE_QUERIES = 2
+
+
+@pytest.fixture(params=[2, 6])
+def family(request, client, make_family):
+    user, family = make_family(babies=request.param)
+    start = datetime.now() - timedelta(days=2)
+    for baby in family.babies:
+        for number in range(30):
+            feeding = Feeding(baby_id=baby.id, user_id=user.id, timestamp=start + timedelta(hours=number),
+                              feeding_type='bottle', bottle_amount=100, version=1)
+            db.session.add(feeding)
+        db.session.add(Note(baby_id=baby.id, timestamp=start, extra='note', version=1))
+    db.session.commit()
+    login(client, 'parent')
+    context_cache.clear()
+    return family
+
+def test_user_page_query_count(client, family):
+    with assert_max_queries(USER_PAGE_QUERIES):
+        response = client.get(f'/user/parent?family_id={family.id}')
+    assert response.status_code == 200
+    assert response.data.count(b'Next Feeds') == 1
+
+def test_index_page_query_count(client, family):
+    with assert_max_queries(INDEX_PAGE_QUERIES):
+        response = client.get(f'/?family_id={family.id}')
+    assert response.status_code == 200
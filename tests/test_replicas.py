@@ -0,0 +1,51 @@
+from app.models import User
+from app.replicas import copy_sqlite
+from app import db
+import sqlalchemy as sa
+
+
+def test_write_request_without_replicas(client):
+    response = client.post('/register', data={
+        'username': 'new', 'email': 'new@example.com', 'password': 'pw', 'password2': 'pw',
+        'family_name': 'New family', 'baby_name': 'Baby', 'baby_dob': '2026-01-01',
+    })
+    assert response.status_code == 302
+    assert db.session.scalar(sa.select(User).where(User.username == 'new')) is not None
+
+def test_reads_stick_to_primary_after_write(tmp_path):
+    from app import create_app
+    from tests.conftest import TestConfig
+
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/primary.db'
+        SQLALCHEMY_BINDS = {'replica0': f'sqlite:///{tmp_path}/replica.db'}
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all()
+        primary, replica = db.engine, db.engines['replica0']
+    client = app.test_client()
+    engines = []
+
+    def record(conn, *args):
+        engines.append(conn.engine)
+    sa.event.listen(sa.engine.Engine, 'before_cursor_execute', record)
+    try:
+        client.post('/register', data={
+            'username': 'new', 'email': 'new@example.com', 'password': 'pw', 'password2': 'pw',
+            'family_name': 'New family', 'baby_name': 'Baby', 'baby_dob': '2026-01-01',
+        })
+        client.post('/login', data={'username': 'new', 'password': 'pw'})
+        # The replica is still empty, but this client just wrote so its reads go to the primary
+        assert client.get('/').status_code == 200
+        assert set(engines) == {primary}
+
+        with app.app_context():
+            copy_sqlite(primary, replica)
+        with client.session_transaction() as session:
+            session['primary_until'] = 0
+        engines.clear()
+        assert client.get('/').status_code == 200
+        assert set(engines) == {replica}
+    finally:
+        sa.event.remove(sa.engine.Engine, 'before_cursor_execute', record)
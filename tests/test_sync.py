@@ -0,0 +1,41 @@
+from app import db
+from app.models import FeedingDailyTotal
+from datetime import date
+import sqlalchemy as sa
+from tests.conftest import login
+import uuid
+
+
+def feeding(client_id, baby_id, amount, hour):
+    return {'client_id': client_id, 'baby_id': baby_id, 'feeding_type': 'bottle', 'bottle_amount': amount,
+            'timestamp': f'2026-01-01T{hour:02}:00'}
+
+def totals(baby_id):
+    row = db.session.execute(sa.select(FeedingDailyTotal.feedings, FeedingDailyTotal.bottle_ml).where(
+        FeedingDailyTotal.baby_id == baby_id, FeedingDailyTotal.day == date(2026, 1, 1))).first()
+    return tuple(row) if row else (0, 0)
+
+def test_retried_batch_is_applied_once(client, make_family):
+    _, family = make_family()
+    login(client, 'parent')
+    batch = {'changes': {'feedings': [feeding(str(uuid.uuid4()), family.babies[0].id, 100, 8)]}}
+    first = client.post(f'/api/v1/families/{family.id}/sync', json=batch)
+    retry = client.post(f'/api/v1/families/{family.id}/sync', json=batch)
+    assert len(first.json['written']['feedings']) == 1
+    assert retry.json['written'] == {'feedings': []}
+    assert retry.json['version'] == first.json['version']
+    assert totals(family.babies[0].id) == (1, 100)
+
+def test_moving_a_feeding_rebuilds_both_babies_totals(client, make_family):
+    _, family = make_family(babies=2)
+    first, second = (baby.id for baby in family.babies)
+    login(client, 'parent')
+    moved = str(uuid.uuid4())
+    client.post(f'/api/v1/families/{family.id}/sync', json={'changes': {'feedings': [
+        feeding(str(uuid.uuid4()), first, 100, 8), feeding(moved, first, 50, 9)]}})
+    assert totals(first) == (2, 150)
+
+    client.post(f'/api/v1/families/{family.id}/sync', json={'changes': {'feedings': [feeding(moved, second, 50, 9)]}})
+    db.session.expire_all()
+    assert totals(first) == (1, 100)
+    assert totals(second) == (1, 50)
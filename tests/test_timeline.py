@@ -0,0 +1,67 @@
+from app import db
+from app.models import Feeding, FeedingArchive, Note, get_baby_events_page
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+
+
+def add_history(user, family, count=60):
+    start = datetime(2026, 1, 1)
+    for baby in family.babies:
+        for number in range(count):
+            # Every third pair shares a timestamp so the id tie-break is exercised
+            timestamp = start + timedelta(hours=number - number % 3 + baby.id % 2)
+            db.session.add(Feeding(baby_id=baby.id, user_id=user.id, timestamp=timestamp, feeding_type='bottle',
+                                   bottle_amount=100, version=1))
+            db.session.add(Note(baby_id=baby.id, timestamp=timestamp, extra=f'note {number}', version=1))
+    db.session.commit()
+
+def test_feeding_pages_merge_babies_in_order(make_family):
+    user, family = make_family(babies=3)
+    add_history(user, family)
+    expected = db.session.scalars(
+        sa.select(Feeding.id).order_by(Feeding.timestamp.desc(), Feeding.id.desc())).all()
+
+    seen, cursor = [], None
+    while True:
+        feedings, cursor = Feeding.get_feedings_page(family.babies, cursor, per_page=7)
+        seen += [feeding.id for feeding in feedings]
+        if not cursor:
+            break
+    assert seen == expected
+
+def test_event_pages_cover_every_event_once(make_family):
+    user, family = make_family(babies=2)
+    add_history(user, family, count=20)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = get_baby_events_page(family.babies, cursor, per_page=9)
+        seen += [(row.kind, row.id) for row in rows]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 80
+    assert [(row.kind, row.id) for row in get_baby_events_page(family.babies, per_page=80)[0]] == seen
+
+def test_timeline_branches_walk_the_index_without_sorting(app, make_family):
+    _, family = make_family(babies=2)
+    query = Feeding._timeline_query(sa.select(Feeding.id), family.babies, limit=21)
+    sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = [row[3] for row in db.session.execute(sa.text('EXPLAIN QUERY PLAN ' + sql))]
+    assert sum('ix_feedings_baby_id_timestamp' in step for step in plan) == 2
+    # Only the final merge of at most 2 x 21 ids is sorted
+    assert sum('TEMP B-TREE' in step for step in plan) == 1
+
+def test_archived_ids_are_not_reused(make_family):
+    user, family = make_family()
+    old = datetime(2025, 1, 1)
+    db.session.add(Feeding(baby_id=family.babies[0].id, user_id=user.id, timestamp=old, feeding_type='bottle',
+                           bottle_amount=100, version=1))
+    db.session.commit()
+    assert FeedingArchive.archive_feedings(cutoff=datetime(2026, 1, 1)) == 1
+
+    feeding = Feeding(baby_id=family.babies[0].id, user_id=user.id, timestamp=old, feeding_type='bottle',
+                      bottle_amount=100, version=1)
+    db.session.add(feeding)
+    db.session.commit()
+    assert FeedingArchive.archive_feedings(cutoff=datetime(2026, 1, 1)) == 1
+    assert len(set(db.session.scalars(sa.select(FeedingArchive.id)))) == 2